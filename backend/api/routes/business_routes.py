@@ -16,6 +16,7 @@ from models.schemas import (
 )
 from database.database import get_db, BusinessAnalysis, User
 from services.business_analysis_service import business_analysis_service
+from services.report_service import build_report_payload
 from services.auth_service import get_current_user
 
 router = APIRouter()
@@ -55,6 +56,7 @@ async def analyze_new_business(
                 risk_score=0,
                 user_id=current_user.id
             )
+            db_analysis.report_payload = build_report_payload(db_analysis)
             db.add(db_analysis)
             db.commit()
         except Exception as db_error:
@@ -87,6 +89,7 @@ async def analyze_new_business(
             leakage_percentage=revenue_analysis.leakage_percentage,
             risk_score=revenue_analysis.risk_assessment.overall_risk_score
         )
+        db_analysis.report_payload = build_report_payload(db_analysis)
         db.add(db_analysis)
         db.commit()
         db.refresh(db_analysis)
@@ -145,6 +148,7 @@ async def analyze_existing_business(
                 risk_score=0,
                 user_id=current_user.id
             )
+            db_analysis.report_payload = build_report_payload(db_analysis)
             db.add(db_analysis)
             db.commit()
         except Exception as db_error:
@@ -3,15 +3,15 @@ API routes for report generation
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
 from datetime import datetime
-import uuid
+from urllib.parse import quote
 import os
 
 from models.schemas import ReportRequest, ReportResponse
 from database.database import get_db, BusinessAnalysis, Report
-from services.report_service import ReportService
+from services.report_service import ReportService, new_report_id
 from core.config import settings
 
 router = APIRouter()
@@ -19,6 +19,13 @@ router = APIRouter()
 # Ensure report directory exists
 os.makedirs(settings.REPORT_DIR, exist_ok=True)
 
+def _attachment_disposition(filename: str) -> str:
+    """Content-Disposition for a download, RFC 5987-encoded when the name isn't plain ASCII (as FileResponse does)"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
 @router.post("/generate", response_model=ReportResponse)
 async def generate_report(
     request: ReportRequest,
@@ -41,7 +48,7 @@ async def generate_report(
     try:
         # Generate report
         report_service = ReportService()
-        report_id = f"RPT-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8]}"
+        report_id = new_report_id()
         
         file_path = await report_service.generate_pdf_report(
             analysis=analysis,
@@ -75,6 +82,48 @@ async def generate_report(
             detail=f"Report generation failed: {str(e)}"
         )
 
+@router.get("/render/{analysis_id}")
+async def render_report(
+    analysis_id: str,
+    include_charts: bool = True,
+    include_recommendations: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Render a PDF report for an analysis straight into the response, without saving it
+    """
+    analysis = db.query(BusinessAnalysis).filter(
+        BusinessAnalysis.analysis_id == analysis_id
+    ).first()
+    
+    if not analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Analysis {analysis_id} not found"
+        )
+    
+    try:
+        # Repeat downloads of an unchanged analysis are served from the render cache
+        report_service = ReportService()
+        report_id, pdf_bytes = await report_service.get_pdf_bytes(
+            analysis=analysis,
+            include_charts=include_charts,
+            include_recommendations=include_recommendations
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Report generation failed: {str(e)}"
+        )
+    
+    filename = f"Revenue_Report_{analysis.business_name.replace(' ', '_')}_{report_id}.pdf"
+    
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": _attachment_disposition(filename)}
+    )
+
 @router.get("/download/{report_id}")
 async def download_report(
     report_id: str,
@@ -48,6 +48,7 @@ class Settings(BaseSettings):
     ALLOWED_FILE_TYPES: list[str] = [".csv", ".xlsx", ".xls"]
     UPLOAD_DIR: str = "uploads"
     REPORT_DIR: str = "reports"
+    CHART_CACHE_DIR: str = "reports/chart_cache"
     
     class Config:
         env_file = ".env"
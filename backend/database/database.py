@@ -2,10 +2,12 @@
 Database configuration and initialization
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Boolean, Text
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Float, DateTime, JSON, Boolean, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import json
+import orjson
 import os
 
 from core.config import settings
@@ -15,10 +17,23 @@ os.makedirs("database", exist_ok=True)
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.REPORT_DIR, exist_ok=True)
 
+def _json_serializer(value) -> str:
+    """Serialize JSON columns with orjson (numpy values and non-string keys allowed)"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+def _json_deserializer(value):
+    """Parse JSON columns with orjson, falling back to json for legacy rows holding NaN/Infinity"""
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return json.loads(value)
+
 # Create engine
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    json_serializer=_json_serializer,
+    json_deserializer=_json_deserializer
 )
 
 # Session factory
@@ -61,6 +76,9 @@ class BusinessAnalysis(Base):
     recovery_strategy = Column(JSON)
     leakage_points = Column(JSON)
     
+    # Render-ready report fields derived from the results above (see report_service)
+    report_payload = Column(JSON)
+    
     # Metrics
     total_revenue = Column(Float)
     leakage_amount = Column(Float)
@@ -70,6 +88,21 @@ class BusinessAnalysis(Base):
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Fields the report payload is derived from
+REPORT_PAYLOAD_SOURCES = (
+    'business_name', 'revenue_analysis', 'recovery_strategy', 'leakage_points',
+    'total_revenue', 'leakage_amount', 'risk_score'
+)
+
+@event.listens_for(BusinessAnalysis, "before_update")
+def _invalidate_report_payload(mapper, connection, target):
+    """Drop a stale report payload; the report service rebuilds it on the next PDF request"""
+    state = inspect(target)
+    if state.attrs.report_payload.history.has_changes():
+        return
+    if any(state.attrs[name].history.has_changes() for name in REPORT_PAYLOAD_SOURCES):
+        target.report_payload = None
     
 class Report(Base):
     """Store generated reports"""
@@ -162,9 +195,36 @@ class Notification(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
+def _ensure_user_id_index():
+    """Add the business_analyses.user_id index to tables created before it was declared"""
+    inspector = inspect(engine)
+    columns = {col['name'] for col in inspector.get_columns(BusinessAnalysis.__tablename__)}
+    if 'user_id' not in columns:
+        return
+    
+    # Any single-column index on user_id will do (migrate_database.py names its own)
+    indexed = any(
+        index['column_names'] == ['user_id']
+        for index in inspector.get_indexes(BusinessAnalysis.__tablename__)
+    )
+    if not indexed:
+        for index in BusinessAnalysis.__table__.indexes:
+            if [col.name for col in index.columns] == ['user_id']:
+                index.create(bind=engine)
+
+def _ensure_report_payload_column():
+    """Add business_analyses.report_payload to tables created before it was declared"""
+    inspector = inspect(engine)
+    columns = {col['name'] for col in inspector.get_columns(BusinessAnalysis.__tablename__)}
+    if 'report_payload' not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE business_analyses ADD COLUMN report_payload JSON"))
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    _ensure_user_id_index()
+    _ensure_report_payload_column()
 
 def get_db():
     """Dependency for getting database session"""
@@ -5,7 +5,7 @@ AI-Powered System to Prevent and Recover Lost Revenue
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from typing import Optional
 import uvicorn
 
@@ -34,7 +34,8 @@ app = FastAPI(
     description="AI-Powered Revenue Loss Prevention and Recovery System",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
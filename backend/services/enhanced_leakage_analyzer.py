@@ -3,10 +3,20 @@ Enhanced Revenue Leakage Analysis Service
 Intelligently analyzes ANY Excel/CSV format to detect financial issues
 """
 
+import heapq
+import logging
+from itertools import chain
+from operator import itemgetter
 import pandas as pd
 import numpy as np
-import uuid
-from typing import Dict, List, Any
+import secrets
+from typing import Dict, Iterable, Iterator, List, Any, Optional
+
+
+# Inputs larger than this are analyzed on a float32 copy of their numeric columns
+FLOAT32_ROW_THRESHOLD = 50_000
+
+logger = logging.getLogger(__name__)
 
 
 class EnhancedLeakageAnalyzer:
@@ -57,125 +67,163 @@ class EnhancedLeakageAnalyzer:
         self.refund_keywords = [
             'refund', 'return', 'chargeback', 'reversal', 'cancellation', 'void'
         ]
+        
+        self.column_keywords = {
+            'revenue': self.revenue_keywords,
+            'cost': self.cost_keywords,
+            'discount': self.discount_keywords,
+            'quantity': self.quantity_keywords,
+            'date': self.date_keywords,
+            'customer': self.customer_keywords,
+            'product': self.product_keywords,
+            'profit': self.profit_keywords,
+            'refund': self.refund_keywords
+        }
+        
+        # Precompiled keyword sets for the exact token fast path in detect_columns
+        self._keyword_sets = {category: frozenset(keywords) for category, keywords in self.column_keywords.items()}
     
-    def fuzzy_match_column(self, col_name: str, keywords: List[str]) -> bool:
-        """Fuzzy match column names with keywords"""
-        col_lower = str(col_name).lower().replace('_', ' ').replace('-', ' ')
+    def _normalize_column(self, col_name: str) -> str:
+        """Lowercase a column name and treat underscores and dashes as spaces"""
+        return str(col_name).lower().replace('_', ' ').replace('-', ' ')
+    
+    def _substring_match(self, col_lower: str, keywords: List[str]) -> bool:
+        """Two-way substring check between a normalized column name and keywords"""
         for keyword in keywords:
             if keyword in col_lower or col_lower in keyword:
                 return True
         return False
     
+    def fuzzy_match_column(self, col_name: str, keywords: List[str]) -> bool:
+        """Fuzzy match column names with keywords"""
+        return self._substring_match(self._normalize_column(col_name), keywords)
+    
     def detect_columns(self, df: pd.DataFrame) -> Dict[str, List[str]]:
         """Intelligently detect column types"""
-        all_columns = df.columns.tolist()
+        buckets = {category: [] for category in self.column_keywords}
         
-        return {
-            'revenue': [col for col in all_columns if self.fuzzy_match_column(col, self.revenue_keywords)],
-            'cost': [col for col in all_columns if self.fuzzy_match_column(col, self.cost_keywords)],
-            'discount': [col for col in all_columns if self.fuzzy_match_column(col, self.discount_keywords)],
-            'quantity': [col for col in all_columns if self.fuzzy_match_column(col, self.quantity_keywords)],
-            'date': [col for col in all_columns if self.fuzzy_match_column(col, self.date_keywords)],
-            'customer': [col for col in all_columns if self.fuzzy_match_column(col, self.customer_keywords)],
-            'product': [col for col in all_columns if self.fuzzy_match_column(col, self.product_keywords)],
-            'profit': [col for col in all_columns if self.fuzzy_match_column(col, self.profit_keywords)],
-            'refund': [col for col in all_columns if self.fuzzy_match_column(col, self.refund_keywords)]
-        }
+        for col in df.columns.tolist():
+            col_lower = self._normalize_column(col)
+            tokens = frozenset(col_lower.split())
+            
+            for category, keyword_set in self._keyword_sets.items():
+                # Whole-token hits are the common case; substring scan only for partial hits
+                if tokens & keyword_set or self._substring_match(col_lower, self.column_keywords[category]):
+                    buckets[category].append(col)
+        
+        return buckets
     
-    def analyze_negative_revenue(self, df: pd.DataFrame, revenue_cols: List[str]) -> List[Dict]:
-        """Detect negative revenue transactions"""
-        leakages = []
+    def _numeric_columns(self, df: pd.DataFrame, cols: List[str]) -> List[str]:
+        """Filter columns down to unique, present, numeric ones so analyzer kernels run unguarded"""
+        return [col for col in dict.fromkeys(cols) if col in df.columns and pd.api.types.is_numeric_dtype(df[col])]
+    
+    def _column_arrays(self, df: pd.DataFrame, cols: List[str]) -> Dict[str, np.ndarray]:
+        """Materialize numeric columns once as float ndarrays, with NaN for missing values"""
+        arrays = {}
+        for col in self._numeric_columns(df, cols):
+            dtype = np.float32 if df[col].dtype == np.float32 else np.float64
+            arrays[col] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+        return arrays
+    
+    def _column_stats(self, df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+        """Per-column null, mean and negative-value statistics from one pass over the block"""
+        cols = [col for col in dict.fromkeys(cols) if col in df.columns]
+        numeric = df[self._numeric_columns(df, cols)]
+        negative = numeric.where(numeric < 0)
         
-        for col in revenue_cols:
-            try:
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    negative_revenue = df[col] < 0
-                    negative_count = negative_revenue.sum()
-                    
-                    if negative_count > 0:
-                        negative_amount = abs(df[negative_revenue][col].sum())
-                        affected_percentage = (negative_count / len(df) * 100)
-                        
-                        # Calculate additional impact (processing costs)
-                        total_impact = negative_amount * 1.25  # 25% overhead
-                        
-                        severity = "critical" if affected_percentage > 10 else "high" if affected_percentage > 5 else "medium"
-                        
-                        leakages.append({
-                            "id": str(uuid.uuid4())[:8],
-                            "type": "Negative Revenue",
-                            "column": col,
-                            "description": f"Found {negative_count} transactions with negative revenue in '{col}' ({affected_percentage:.1f}% of all transactions). This indicates refunds, chargebacks, or data errors directly reducing revenue.",
-                            "amount": float(total_impact),
-                            "severity": severity,
-                            "category": "Revenue Loss",
-                            "status": "active",
-                            "affected_rows": int(negative_count),
-                            "recommendation": f"Investigate these {negative_count} transactions immediately. Analyze refund root causes or correct data errors. Implement validation rules to prevent future occurrences."
-                        })
-            except Exception as e:
-                print(f"Error analyzing revenue column {col}: {e}")
+        return pd.DataFrame({
+            'null_count': df[cols].isna().sum(),
+            'mean': numeric.mean(),
+            'negative_count': negative.count(),
+            'negative_sum': negative.sum()
+        }, index=cols)
+    
+    def analyze_negative_revenue(self, df: pd.DataFrame, revenue_cols: List[str], stats: Optional[pd.DataFrame] = None) -> Iterator[Dict]:
+        """Detect negative revenue transactions"""
+        if stats is None:
+            stats = self._column_stats(df, revenue_cols)
         
-        return leakages
+        for col in self._numeric_columns(df, revenue_cols):
+            negative_count = int(stats.at[col, 'negative_count'])
+            
+            if negative_count > 0:
+                negative_amount = abs(stats.at[col, 'negative_sum'])
+                affected_percentage = (negative_count / len(df) * 100)
+                
+                # Calculate additional impact (processing costs)
+                total_impact = negative_amount * 1.25  # 25% overhead
+                
+                severity = "critical" if affected_percentage > 10 else "high" if affected_percentage > 5 else "medium"
+                
+                yield {
+                    "id": secrets.token_hex(4),
+                    "type": "Negative Revenue",
+                    "column": col,
+                    "description": f"Found {negative_count} transactions with negative revenue in '{col}' ({affected_percentage:.1f}% of all transactions). This indicates refunds, chargebacks, or data errors directly reducing revenue.",
+                    "amount": float(total_impact),
+                    "severity": severity,
+                    "category": "Revenue Loss",
+                    "status": "active",
+                    "affected_rows": int(negative_count),
+                    "recommendation": f"Investigate these {negative_count} transactions immediately. Analyze refund root causes or correct data errors. Implement validation rules to prevent future occurrences."
+                }
     
-    def analyze_excessive_discounts(self, df: pd.DataFrame, discount_cols: List[str], revenue_cols: List[str]) -> List[Dict]:
+    def analyze_excessive_discounts(self, df: pd.DataFrame, discount_cols: List[str], revenue_cols: List[str], arrays: Optional[Dict[str, np.ndarray]] = None) -> Iterator[Dict]:
         """Analyze discount patterns"""
-        leakages = []
+        if arrays is None:
+            arrays = self._column_arrays(df, discount_cols + revenue_cols)
         
-        for col in discount_cols:
-            try:
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    total_discounts = abs(df[col].sum())
-                    avg_discount = df[col].mean()
-                    high_discount_count = (abs(df[col]) > abs(avg_discount) * 2).sum()
-                    
-                    discount_percentage = 0
-                    if revenue_cols and total_discounts > 0:
-                        first_rev_col = next((c for c in revenue_cols if c in df.columns and pd.api.types.is_numeric_dtype(df[c])), None)
-                        if first_rev_col:
-                            total_revenue = df[first_rev_col].sum()
-                            if total_revenue > 0:
-                                discount_percentage = (total_discounts / total_revenue * 100)
-                    
-                    if total_discounts > 0 and (discount_percentage > 15 or high_discount_count > len(df) * 0.1):
-                        severity = "high" if discount_percentage > 20 else "medium"
-                        
-                        leakages.append({
-                            "id": str(uuid.uuid4())[:8],
-                            "type": "Excessive Discounts",
-                            "column": col,
-                            "description": f"Total discounts: ${total_discounts:,.2f}" + (f" ({discount_percentage:.1f}% of revenue)" if discount_percentage > 0 else "") + f". Found {high_discount_count} unusually high discounts. Excessive discounting erodes margins and trains customers to wait for sales.",
-                            "amount": float(total_discounts),
-                            "severity": severity,
-                            "category": "Pricing Strategy",
-                            "status": "active",
-                            "affected_rows": int(high_discount_count),
-                            "recommendation": f"Cap discounts at 15% maximum, require manager approval for >10%. Implement tiered pricing or bundle deals. Potential savings: ${total_discounts * 0.3:,.2f}"
-                        })
-            except Exception as e:
-                print(f"Error analyzing discount column {col}: {e}")
+        # Revenue baseline is the same for every discount column
+        first_rev_col = next(iter(self._numeric_columns(df, revenue_cols)), None)
+        total_revenue = float(np.nansum(arrays[first_rev_col])) if first_rev_col else 0.0
         
-        return leakages
+        for col in self._numeric_columns(df, discount_cols):
+            values = arrays[col]
+            present_count = np.count_nonzero(~np.isnan(values))
+            column_sum = np.nansum(values)
+            total_discounts = abs(column_sum)
+            avg_discount = column_sum / present_count if present_count else np.nan
+            high_discount_count = np.count_nonzero(np.abs(values) > abs(avg_discount) * 2)
+            
+            discount_percentage = 0
+            if total_discounts > 0 and total_revenue > 0:
+                discount_percentage = (total_discounts / total_revenue * 100)
+            
+            if total_discounts > 0 and (discount_percentage > 15 or high_discount_count > len(df) * 0.1):
+                severity = "high" if discount_percentage > 20 else "medium"
+                
+                yield {
+                    "id": secrets.token_hex(4),
+                    "type": "Excessive Discounts",
+                    "column": col,
+                    "description": f"Total discounts: ${total_discounts:,.2f}" + (f" ({discount_percentage:.1f}% of revenue)" if discount_percentage > 0 else "") + f". Found {high_discount_count} unusually high discounts. Excessive discounting erodes margins and trains customers to wait for sales.",
+                    "amount": float(total_discounts),
+                    "severity": severity,
+                    "category": "Pricing Strategy",
+                    "status": "active",
+                    "affected_rows": int(high_discount_count),
+                    "recommendation": f"Cap discounts at 15% maximum, require manager approval for >10%. Implement tiered pricing or bundle deals. Potential savings: ${total_discounts * 0.3:,.2f}"
+                }
     
-    def analyze_missing_data(self, df: pd.DataFrame, revenue_cols: List[str], cost_cols: List[str]) -> List[Dict]:
+    def analyze_missing_data(self, df: pd.DataFrame, revenue_cols: List[str], cost_cols: List[str], stats: Optional[pd.DataFrame] = None) -> Iterator[Dict]:
         """Detect missing data in critical columns"""
-        leakages = []
-        
         critical_cols = revenue_cols + cost_cols
         
+        if stats is None:
+            stats = self._column_stats(df, critical_cols)
+        
         for col in critical_cols:
-            null_count = df[col].isnull().sum()
+            null_count = int(stats.at[col, 'null_count'])
             if null_count > 0:
                 impact_amount = 0
-                if col in revenue_cols and pd.api.types.is_numeric_dtype(df[col]):
-                    avg_value = df[col].mean()
-                    if not np.isnan(avg_value):
-                        impact_amount = avg_value * null_count
+                avg_value = stats.at[col, 'mean']
+                if col in revenue_cols and not np.isnan(avg_value):
+                    impact_amount = avg_value * null_count
                 
                 severity = "high" if col in revenue_cols else "medium" if col in cost_cols else "low"
                 
-                leakages.append({
-                    "id": str(uuid.uuid4())[:8],
+                yield {
+                    "id": secrets.token_hex(4),
                     "type": "Missing Data",
                     "column": col,
                     "description": f"Found {null_count} missing values in '{col}' ({(null_count/len(df)*100):.1f}% of data). Missing financial data leads to incomplete analysis and potential revenue loss.",
@@ -185,25 +233,21 @@ class EnhancedLeakageAnalyzer:
                     "status": "active",
                     "affected_rows": int(null_count),
                     "recommendation": "Make critical fields mandatory in data entry systems. Implement real-time validation and staff training on data completeness."
-                })
-        
-        return leakages
+                }
     
-    def analyze_duplicates(self, df: pd.DataFrame, revenue_cols: List[str]) -> List[Dict]:
+    def analyze_duplicates(self, df: pd.DataFrame, revenue_cols: List[str]) -> Iterator[Dict]:
         """Detect duplicate transactions"""
-        leakages = []
-        
         duplicate_count = df.duplicated().sum()
         if duplicate_count > 0:
             duplicate_amount = 0
             if revenue_cols:
-                first_rev_col = next((c for c in revenue_cols if c in df.columns and pd.api.types.is_numeric_dtype(df[c])), None)
+                first_rev_col = next(iter(self._numeric_columns(df, revenue_cols)), None)
                 if first_rev_col:
                     duplicate_rows = df[df.duplicated(keep=False)]
                     duplicate_amount = duplicate_rows[first_rev_col].sum() / 2
             
-            leakages.append({
-                "id": str(uuid.uuid4())[:8],
+            yield {
+                "id": secrets.token_hex(4),
                 "type": "Duplicate Transactions",
                 "column": "All Columns",
                 "description": f"Found {duplicate_count} duplicate rows - may indicate double billing, data entry errors, or system glitches.",
@@ -213,20 +257,16 @@ class EnhancedLeakageAnalyzer:
                 "status": "active",
                 "affected_rows": int(duplicate_count),
                 "recommendation": "Implement unique transaction IDs and duplicate detection in POS systems. Regular database deduplication and customer notification for duplicate charges."
-            })
-        
-        return leakages
+            }
     
-    def analyze_pricing_inconsistencies(self, df: pd.DataFrame, product_cols: List[str], revenue_cols: List[str]) -> List[Dict]:
+    def analyze_pricing_inconsistencies(self, df: pd.DataFrame, product_cols: List[str], revenue_cols: List[str]) -> Iterator[Dict]:
         """Detect pricing inconsistencies across products"""
-        leakages = []
-        
         if product_cols and revenue_cols:
             for product_col in product_cols[:1]:
                 for revenue_col in revenue_cols[:1]:
                     try:
                         if pd.api.types.is_numeric_dtype(df[revenue_col]):
-                            price_by_product = df.groupby(product_col)[revenue_col].agg(['mean', 'std', 'count'])
+                            price_by_product = df.groupby(product_col, sort=False, observed=True)[revenue_col].agg(['mean', 'std', 'count'])
                             price_by_product['cv'] = (price_by_product['std'] / price_by_product['mean'] * 100)
                             
                             inconsistent = price_by_product[
@@ -241,8 +281,8 @@ class EnhancedLeakageAnalyzer:
                                     optimal_price = row['mean'] + (row['std'] * 0.5)
                                     estimated_loss += (optimal_price - row['mean']) * row['count']
                                 
-                                leakages.append({
-                                    "id": str(uuid.uuid4())[:8],
+                                yield {
+                                    "id": secrets.token_hex(4),
                                     "type": "Pricing Inconsistencies",
                                     "column": f"{product_col}, {revenue_col}",
                                     "description": f"Found {len(inconsistent)} products with inconsistent pricing (>20% price variation). Revenue leakage from underpricing some transactions.",
@@ -252,75 +292,106 @@ class EnhancedLeakageAnalyzer:
                                     "status": "active",
                                     "affected_rows": int(inconsistent['count'].sum()),
                                     "recommendation": "Standardize pricing across all channels. Create centralized price list and train sales staff on consistent pricing policies."
-                                })
-                    except Exception as e:
-                        print(f"Error analyzing pricing consistency: {e}")
-        
-        return leakages
+                                }
+                    except Exception:
+                        logger.exception("Error analyzing pricing consistency")
     
-    def analyze_customer_concentration(self, df: pd.DataFrame, customer_cols: List[str], revenue_cols: List[str]) -> List[Dict]:
+    def analyze_customer_concentration(self, df: pd.DataFrame, customer_cols: List[str], revenue_cols: List[str]) -> Iterator[Dict]:
         """Analyze customer concentration risk"""
-        leakages = []
-        
         if customer_cols and revenue_cols:
             for customer_col in customer_cols[:1]:
                 for revenue_col in revenue_cols[:1]:
                     try:
                         if pd.api.types.is_numeric_dtype(df[revenue_col]):
-                            customer_revenue = df.groupby(customer_col)[revenue_col].sum().sort_values(ascending=False)
+                            # Integer-code customers and sum revenue per code in a single bincount pass
+                            if isinstance(df[customer_col].dtype, pd.CategoricalDtype):
+                                codes = df[customer_col].cat.codes.to_numpy()
+                            else:
+                                codes, _ = pd.factorize(df[customer_col])
+                            revenue = df[revenue_col].to_numpy(dtype=np.float64, na_value=0.0)
+                            valid = codes >= 0
+                            customer_revenue = np.bincount(codes[valid], weights=revenue[valid])
+                            customer_count = np.count_nonzero(np.bincount(codes[valid]))
                             total_revenue = customer_revenue.sum()
                             
-                            if len(customer_revenue) > 5:
-                                top_customer_pct = (customer_revenue.iloc[0] / total_revenue * 100)
+                            if customer_count > 5:
+                                top_idx = customer_revenue.argmax()
+                                top_revenue = customer_revenue[top_idx]
+                                top_customer_pct = (top_revenue / total_revenue * 100)
                                 
                                 if top_customer_pct > 30:
-                                    risk_amount = customer_revenue.iloc[0] * 0.5
+                                    risk_amount = top_revenue * 0.5
                                     
-                                    leakages.append({
-                                        "id": str(uuid.uuid4())[:8],
+                                    yield {
+                                        "id": secrets.token_hex(4),
                                         "type": "Customer Concentration Risk",
                                         "column": f"{customer_col}, {revenue_col}",
-                                        "description": f"Top customer represents {top_customer_pct:.1f}% of revenue (${customer_revenue.iloc[0]:,.2f}). Losing this customer would devastate the business.",
+                                        "description": f"Top customer represents {top_customer_pct:.1f}% of revenue (${top_revenue:,.2f}). Losing this customer would devastate the business.",
                                         "amount": float(risk_amount),
                                         "severity": "high",
                                         "category": "Business Risk",
                                         "status": "active",
-                                        "affected_rows": len(df[df[customer_col] == customer_revenue.index[0]]),
+                                        "affected_rows": int(np.count_nonzero(codes == top_idx)),
                                         "recommendation": "Diversify customer base urgently. No single customer should exceed 20% of revenue. Develop new customer acquisition strategy."
-                                    })
-                    except Exception as e:
-                        print(f"Error analyzing customer concentration: {e}")
+                                    }
+                    except Exception:
+                        logger.exception("Error analyzing customer concentration")
+    
+    def _numeric_view(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast numeric columns to float32 for the bulk analyzers on large inputs"""
+        if len(df) <= FLOAT32_ROW_THRESHOLD:
+            return df
         
-        return leakages
+        numeric_cols = df.select_dtypes('number').columns
+        return df.astype({col: np.float32 for col in numeric_cols})
     
-    def analyze_complete(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _tally(self, leakages: Iterable[Dict], totals: Dict[str, Any]) -> Iterator[Dict]:
+        """Pass leakages through while accumulating their count and total amount"""
+        for leakage in leakages:
+            totals["count"] += 1
+            totals["amount"] += leakage['amount']
+            yield leakage
+    
+    def analyze_complete(self, df: pd.DataFrame, max_items: Optional[int] = None) -> Dict[str, Any]:
         """
         Perform complete leakage analysis on uploaded data
-        Returns comprehensive leakage report
+        Returns comprehensive leakage report; max_items limits the returned items to the largest ones
         """
+        # A cutoff below one would stop the stream before the totals are tallied
+        if max_items is not None and max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        
         # Detect all column types
         columns = self.detect_columns(df)
         
-        # Run all analyses
-        all_leakages = []
+        # Sums, means and masks only need float32 precision; groupbys keep the original frame
+        numeric_view = self._numeric_view(df)
         
-        all_leakages.extend(self.analyze_negative_revenue(df, columns['revenue']))
-        all_leakages.extend(self.analyze_excessive_discounts(df, columns['discount'], columns['revenue']))
-        all_leakages.extend(self.analyze_missing_data(df, columns['revenue'], columns['cost']))
-        all_leakages.extend(self.analyze_duplicates(df, columns['revenue']))
-        all_leakages.extend(self.analyze_pricing_inconsistencies(df, columns['product'], columns['revenue']))
-        all_leakages.extend(self.analyze_customer_concentration(df, columns['customer'], columns['revenue']))
+        # Negative revenue and missing data checks share one statistics table
+        column_stats = self._column_stats(numeric_view, columns['revenue'] + columns['cost'])
+        column_arrays = self._column_arrays(numeric_view, columns['discount'] + columns['revenue'])
         
-        # Calculate total financial impact
-        total_amount = sum(l['amount'] for l in all_leakages)
+        # Run all analyses as one lazy stream, tallying totals as leakages go by
+        totals = {"count": 0, "amount": 0}
+        all_leakages = self._tally(chain(
+            self.analyze_negative_revenue(numeric_view, columns['revenue'], column_stats),
+            self.analyze_excessive_discounts(numeric_view, columns['discount'], columns['revenue'], column_arrays),
+            self.analyze_missing_data(numeric_view, columns['revenue'], columns['cost'], column_stats),
+            self.analyze_duplicates(df, columns['revenue']),
+            self.analyze_pricing_inconsistencies(df, columns['product'], columns['revenue']),
+            self.analyze_customer_concentration(df, columns['customer'], columns['revenue'])
+        ), totals)
         
-        # Sort by amount (highest first)
-        all_leakages.sort(key=lambda x: x['amount'], reverse=True)
+        # Sort by amount (highest first), keeping only the top max_items when requested
+        if max_items is None:
+            items = sorted(all_leakages, key=itemgetter('amount'), reverse=True)
+        else:
+            items = heapq.nlargest(max_items, all_leakages, key=itemgetter('amount'))
         
         return {
-            "total_leakages": len(all_leakages),
-            "total_amount": total_amount,
-            "items": all_leakages,
+            "total_leakages": totals["count"],
+            "total_amount": totals["amount"],
+            "items": items,
             "columns_analyzed": {
                 "total_columns": len(df.columns),
                 "revenue_columns": columns['revenue'],
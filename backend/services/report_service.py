@@ -3,77 +3,355 @@ Report generation service
 Creates PDF reports with charts and recommendations
 """
 
+import asyncio
+import hashlib
+import heapq
+import io
 import os
-from datetime import datetime
-from typing import List
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+from reportlab import rl_config
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, Image
+    SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle,
+    PageBreak
 )
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.graphics.charts.barcharts import VerticalBarChart
 
-from database.database import BusinessAnalysis
+from database.database import BusinessAnalysis, SessionLocal, engine
 from core.config import settings
 
+# Per-attribute validation on shapes and charts dominates render time; keep it for development only
+if not settings.DEBUG:
+    rl_config.shapeChecking = 0
+
+# Report palette, parsed once
+C_NAVY = colors.HexColor('#1a237e')
+C_BLUE = colors.HexColor('#0d47a1')
+C_RED = colors.HexColor('#c62828')
+C_RED_LIGHT = colors.HexColor('#ffebee')
+C_ROW_ALT = colors.HexColor('#f5f5f5')
+
+# Table scaffolding is identical in every report, so build it once
+METRICS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), C_NAVY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 11),
+    ('ROWHEIGHT', (0, 1), (-1, -1), 25)
+])
+
+TIMELINE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), C_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+])
+
+LEAKAGE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), C_NAVY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, C_ROW_ALT]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+# Report text templates, filled per report with str.format_map
+GENERATED_ON_TMPL = "<i>Generated on: {generated_on}</i>"
+
+SUMMARY_TMPL = """
+This report presents a comprehensive analysis of revenue leakage for <b>{business_name}</b>, 
+a {business_stage} {business_model} business in the {industry} industry.
+<br/><br/>
+<b>Overall Assessment:</b> {risk_level} RISK
+<br/><br/>
+Our analysis has identified <b>{leakage_amount_fmt}</b> in potential revenue leakage, 
+representing <b>{leakage_percentage}%</b> of total revenue. 
+Of this amount, approximately <b>{recoverable_fmt}</b> 
+is recoverable through the implementation of recommended strategies.
+<br/><br/>
+The analysis identified <b>{leakage_point_count} key leakage points</b> requiring immediate attention.
+"""
+
+RISK_TMPL = """
+<b>Risk Score:</b> {overall_risk_score}/100<br/>
+<b>Risk Level:</b> {risk_level}<br/>
+<b>Vulnerability Areas:</b> {vulnerability_areas}
+"""
+
+RECOVERY_TMPL = """
+<b>Expected Revenue Recovery:</b> {expected_recovery_fmt}<br/>
+By implementing these recommendations, your business can recover a significant portion of lost revenue 
+and prevent future leakage.
+"""
+
+FOOTER_TMPL = """
+<br/><br/>
+<i>This report was generated by Smart Revenue Leakage Advisor<br/>
+Report ID: {report_id}<br/>
+For more information, visit our website or contact support.</i>
+"""
+
+# Hard caps that keep table and list layout time bounded however large an analysis gets
+MAX_LEAKAGE_ROWS = 50
+MAX_LIST_ITEMS = 20
+
+def _cap_items(items: List, limit: int = MAX_LIST_ITEMS) -> List:
+    """Trim a list to `limit` entries, noting how many were left out"""
+    
+    if len(items) <= limit:
+        return items
+    return list(items[:limit]) + [f"…and {len(items) - limit} more"]
+
+# Pie slice colors, largest leakage first (matplotlib hex strings, not ReportLab colors)
+PIE_COLORS = ['#ef5350', '#ff7043', '#ffa726', '#ffca28', '#66bb6a', '#42a5f5']
+
+# Pie PNG size (same footprint as the former 400x200pt drawing) and resolution
+PIE_FIGSIZE = (400 / 72, 200 / 72)
+PIE_DPI = 150
+
+# Bump when the chart styling changes in ways the constants above don't capture
+PIE_STYLE_VERSION = 1
+
+def _render_pie_chart(categories: List[str], amounts: List[float]) -> Optional[str]:
+    """Render the leakage pie chart to a PNG, cached on disk by a hash of its data and styling"""
+    
+    # matplotlib rejects zero-sum and negative wedges; only positive losses get a slice
+    slices = [(category, amount) for category, amount in zip(categories, amounts) if amount > 0]
+    if not slices:
+        return None
+    categories, amounts = [category for category, _ in slices], [amount for _, amount in slices]
+    
+    key = hashlib.sha256(
+        repr((PIE_STYLE_VERSION, PIE_COLORS, PIE_FIGSIZE, PIE_DPI, slices)).encode()
+    ).hexdigest()
+    path = os.path.join(settings.CHART_CACHE_DIR, f"{key}.png")
+    
+    if not os.path.exists(path):
+        # matplotlib is only needed on a cache miss, so keep it out of module import time
+        from matplotlib.figure import Figure
+        
+        os.makedirs(settings.CHART_CACHE_DIR, exist_ok=True)
+        
+        # Figure API (no pyplot) keeps rendering free of global state in worker threads
+        fig = Figure(figsize=PIE_FIGSIZE, dpi=PIE_DPI)
+        ax = fig.subplots()
+        ax.pie(
+            amounts,
+            labels=categories,
+            colors=PIE_COLORS[:len(amounts)],
+            wedgeprops={'linewidth': 0.5, 'edgecolor': 'black'},
+            textprops={'fontsize': 7}
+        )
+        ax.set_aspect('equal')
+        
+        # Write under a temporary name so concurrent reports never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fig.savefig(tmp_path, format='png')
+        os.replace(tmp_path, path)
+    
+    return path
+
+def new_report_id() -> str:
+    """Generate a report ID such as RPT-20240101-1a2b3c4d"""
+    return f"RPT-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8]}"
+
+def _report_path(analysis: BusinessAnalysis, report_id: str) -> str:
+    """Output path for a report, creating the report directory if needed"""
+    
+    os.makedirs(settings.REPORT_DIR, exist_ok=True)
+    filename = f"{report_id}_{analysis.business_name.replace(' ', '_')}.pdf"
+    return os.path.join(settings.REPORT_DIR, filename)
+
+def _render_pdf(story: List) -> bytes:
+    """Lay out a story into PDF bytes, in memory"""
+    
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+    doc.build(story)
+    return buf.getvalue()
+
+def _write_file(filepath: str, data: bytes):
+    """Write a finished file with a single write call instead of many small buffered ones"""
+    
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+# Bump when the payload layout changes so stored payloads are rebuilt
+REPORT_PAYLOAD_VERSION = 1
+
+def build_report_payload(analysis: BusinessAnalysis) -> Dict[str, Any]:
+    """Precompute the render-ready report fields for an analysis (stored in report_payload)"""
+    
+    revenue_analysis = analysis.revenue_analysis or {}
+    recovery_strategy = analysis.recovery_strategy or {}
+    risk_data = revenue_analysis.get('risk_assessment') or {}
+    leakage_points = analysis.leakage_points or []
+    
+    # Top 6 leakage points by loss for the breakdown chart
+    top_points = heapq.nlargest(6, leakage_points, key=lambda lp: lp.get('estimated_loss', 0))
+    
+    priority_order = {'high': 0, 'medium': 1, 'low': 2}
+    priority_actions = sorted(
+        recovery_strategy.get('priority_actions', []),
+        key=lambda action: priority_order.get(action.get('priority'), len(priority_order))
+    )
+    
+    return {
+        "version": REPORT_PAYLOAD_VERSION,
+        "total_revenue_fmt": f"${analysis.total_revenue or 0:,.2f}",
+        "leakage_amount_fmt": f"${analysis.leakage_amount or 0:,.2f}",
+        "recoverable_fmt": f"${revenue_analysis.get('recoverable_amount', 0):,.2f}",
+        "expected_recovery_fmt": f"${recovery_strategy.get('expected_recovery', 0):,.2f}",
+        "leakage_point_count": len(leakage_points),
+        "overall_risk_score": risk_data.get('overall_risk_score', analysis.risk_score),
+        "risk_level": str(risk_data.get('risk_level', 'n/a')).upper(),
+        "vulnerability_areas": ', '.join(risk_data.get('vulnerability_areas', [])),
+        "risk_factors": [str(factor) for factor in risk_data.get('risk_factors', [])],
+        "priority_actions": [f"{action['action']} ({action['priority']} priority)" for action in priority_actions],
+        "chart_categories": [str(lp.get('category', ''))[:20] for lp in top_points],
+        "chart_amounts": [lp.get('estimated_loss', 0) for lp in top_points]
+    }
+
+@lru_cache(maxsize=1)
+def _get_styles() -> StyleSheet1:
+    """Build the report stylesheet once and share it across ReportService instances"""
+    
+    # getSampleStyleSheet returns a fresh StyleSheet1, so adding to it never double-registers
+    styles = getSampleStyleSheet()
+    
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=C_NAVY,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        bold=True
+    ))
+    
+    # Section heading
+    styles.add(ParagraphStyle(
+        name='SectionHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=C_BLUE,
+        spaceAfter=12,
+        spaceBefore=12,
+        bold=True
+    ))
+    
+    # Highlight box
+    styles.add(ParagraphStyle(
+        name='HighlightBox',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=C_RED,
+        backColor=C_RED_LIGHT,
+        borderPadding=10,
+        spaceAfter=10
+    ))
+    
+    # Recommendation
+    styles.add(ParagraphStyle(
+        name='Recommendation',
+        parent=styles['Normal'],
+        fontSize=11,
+        leftIndent=20,
+        bulletIndent=10,
+        spaceAfter=8
+    ))
+    
+    # Wrapped text inside table cells
+    styles.add(ParagraphStyle(
+        name='TableCell',
+        parent=styles['Normal'],
+        fontSize=8,
+        leading=10
+    ))
+    
+    return styles
+
+# Recently rendered PDFs, most recently used last: cache key -> (report_id, PDF bytes)
+PDF_CACHE_SIZE = 256
+_pdf_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+def _pdf_cache_key(analysis: BusinessAnalysis, include_charts: bool, include_recommendations: bool) -> str:
+    """Cache key for a rendered report; changes when the analysis is updated or the day rolls over"""
+    
+    # The date is part of the key because the report prints its generation date
+    raw = repr((analysis.analysis_id, analysis.updated_at, include_charts, include_recommendations, date.today()))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _init_bulk_worker():
+    """Process pool initializer: drop inherited DB connections and warm the style cache"""
+    
+    engine.dispose(close=False)
+    if not settings.DEBUG:
+        rl_config.shapeChecking = 0
+    _get_styles()
+
+@lru_cache(maxsize=1)
+def _get_bulk_executor() -> ProcessPoolExecutor:
+    """Process pool for bulk report generation, created on first use"""
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_bulk_worker)
+
+def _build_one(analysis_pk: int, report_id: str, include_charts: bool, include_recommendations: bool) -> Optional[str]:
+    """Render and save one report inside a bulk worker process (None if the analysis no longer exists)"""
+    
+    db = SessionLocal()
+    try:
+        analysis = db.get(BusinessAnalysis, analysis_pk)
+        if analysis is None:
+            # Deleted after the batch was queued; skip it rather than failing the whole batch
+            return None
+        filepath = _report_path(analysis, report_id)
+        _write_file(filepath, ReportService()._build_pdf(analysis, report_id, include_charts, include_recommendations))
+        return filepath
+    finally:
+        db.close()
+
 class ReportService:
     """Service for generating PDF reports"""
     
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Setup custom paragraph styles"""
-        
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a237e'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            bold=True
-        ))
-        
-        # Section heading
-        self.styles.add(ParagraphStyle(
-            name='SectionHeading',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#0d47a1'),
-            spaceAfter=12,
-            spaceBefore=12,
-            bold=True
-        ))
-        
-        # Highlight box
-        self.styles.add(ParagraphStyle(
-            name='HighlightBox',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=colors.HexColor('#c62828'),
-            backColor=colors.HexColor('#ffebee'),
-            borderPadding=10,
-            spaceAfter=10
-        ))
-        
-        # Recommendation
-        self.styles.add(ParagraphStyle(
-            name='Recommendation',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            leftIndent=20,
-            bulletIndent=10,
-            spaceAfter=8
-        ))
+        self.styles = _get_styles()
     
     async def generate_pdf_report(
         self,
@@ -82,58 +360,158 @@ class ReportService:
         include_charts: bool = True,
         include_recommendations: bool = True
     ) -> str:
-        """Generate comprehensive PDF report"""
-        
-        # Create report directory if it doesn't exist
-        os.makedirs(settings.REPORT_DIR, exist_ok=True)
-        
-        # Generate filename
-        filename = f"{report_id}_{analysis.business_name.replace(' ', '_')}.pdf"
-        filepath = os.path.join(settings.REPORT_DIR, filename)
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            filepath,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
+        """Generate comprehensive PDF report and save it under REPORT_DIR"""
+        
+        filepath = _report_path(analysis, report_id)
+        data = await self.generate_pdf_bytes(analysis, report_id, include_charts, include_recommendations)
+        
+        # Disk writes can stall on slow volumes, so keep them off the event loop too
+        await asyncio.to_thread(_write_file, filepath, data)
+        
+        return filepath
+    
+    async def generate_pdf_bytes(
+        self,
+        analysis: BusinessAnalysis,
+        report_id: str,
+        include_charts: bool = True,
+        include_recommendations: bool = True
+    ) -> bytes:
+        """Generate a PDF report in memory, for sending straight to the client"""
+        
+        # Build PDF off the event loop; chart rendering and ReportLab layout are synchronous and CPU-bound
+        return await asyncio.to_thread(self._build_pdf, analysis, report_id, include_charts, include_recommendations)
+    
+    async def get_pdf_bytes(
+        self,
+        analysis: BusinessAnalysis,
+        include_charts: bool = True,
+        include_recommendations: bool = True
+    ) -> Tuple[str, bytes]:
+        """Return (report_id, PDF bytes) for an analysis, reusing a recent render of the same version"""
+        
+        key = _pdf_cache_key(analysis, include_charts, include_recommendations)
+        cached = _pdf_cache.get(key)
+        if cached is not None:
+            _pdf_cache.move_to_end(key)
+            return cached
+        
+        # The report ID is printed in the PDF, so it is cached together with the bytes
+        report_id = new_report_id()
+        pdf_bytes = await self.generate_pdf_bytes(analysis, report_id, include_charts, include_recommendations)
+        
+        _pdf_cache[key] = (report_id, pdf_bytes)
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+        
+        return report_id, pdf_bytes
+    
+    async def generate_pdf_reports_bulk(
+        self,
+        analyses: List[BusinessAnalysis],
+        include_charts: bool = True,
+        include_recommendations: bool = True
+    ) -> List[Tuple[str, Optional[str]]]:
+        """Generate reports for many analyses in parallel worker processes, returning (report_id, file path) pairs
+
+        The file path is None for analyses deleted before their worker ran.
+        """
+        
+        loop = asyncio.get_running_loop()
+        executor = _get_bulk_executor()
+        report_ids = [new_report_id() for _ in analyses]
+        
+        # Workers load each analysis by primary key from their own session
+        filepaths = await asyncio.gather(*[
+            loop.run_in_executor(executor, _build_one, analysis.id, report_id, include_charts, include_recommendations)
+            for analysis, report_id in zip(analyses, report_ids)
+        ])
+        
+        return list(zip(report_ids, filepaths))
+    
+    def _build_pdf(
+        self,
+        analysis: BusinessAnalysis,
+        report_id: str,
+        include_charts: bool,
+        include_recommendations: bool
+    ) -> bytes:
+        """Assemble and lay out one report (charts included) into PDF bytes"""
+        
+        return _render_pdf(self._build_story(analysis, report_id, include_charts, include_recommendations))
+    
+    def _build_story(
+        self,
+        analysis: BusinessAnalysis,
+        report_id: str,
+        include_charts: bool,
+        include_recommendations: bool
+    ) -> List:
+        """Assemble the flowables for one report"""
+        
+        # Derived fields are stored with the analysis; rebuild only for older rows
+        payload = analysis.report_payload
+        if not payload or payload.get('version') != REPORT_PAYLOAD_VERSION:
+            payload = build_report_payload(analysis)
+        
+        # Bind the remaining JSON columns once; every section reads from these locals
+        recovery_strategy = analysis.recovery_strategy or {}
+        leakage_points = analysis.leakage_points
+        
+        # Formatted values shared by every template in the report
+        ctx = self._report_context(analysis, report_id, payload)
         
         # Container for PDF elements
         story = []
         
         # Add content
-        self._add_cover_page(story, analysis)
+        self._add_cover_page(story, ctx)
         story.append(PageBreak())
         
-        self._add_executive_summary(story, analysis)
+        self._add_executive_summary(story, ctx)
         story.append(Spacer(1, 0.3*inch))
         
-        self._add_revenue_analysis(story, analysis)
+        self._add_revenue_analysis(story, ctx)
         story.append(Spacer(1, 0.3*inch))
         
         if include_charts:
-            self._add_charts(story, analysis)
+            self._add_charts(story, ctx)
             story.append(Spacer(1, 0.3*inch))
         
-        self._add_leakage_details(story, analysis)
+        self._add_leakage_details(story, leakage_points)
         story.append(PageBreak())
         
         if include_recommendations:
-            self._add_recovery_strategy(story, analysis)
+            self._add_recovery_strategy(story, recovery_strategy, ctx)
             story.append(PageBreak())
-            self._add_implementation_plan(story, analysis)
+            self._add_implementation_plan(story, recovery_strategy, ctx)
         
-        self._add_footer(story, report_id)
+        self._add_footer(story, ctx)
         
-        # Build PDF
-        doc.build(story)
+        return story
+    
+    def _report_context(self, analysis: BusinessAnalysis, report_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine the stored report payload with the per-request values the templates interpolate"""
+        
+        return {
+            **payload,
+            "report_id": report_id,
+            "generated_on": datetime.now().strftime('%B %d, %Y'),
+            "business_name": analysis.business_name,
+            "business_stage": analysis.business_stage,
+            "business_model": analysis.business_model,
+            "industry": analysis.industry,
+            "leakage_percentage": analysis.leakage_percentage,
+            "risk_score": analysis.risk_score
+        }
+    
+    def _add_bullets(self, story: List, items: List):
+        """Add a bullet list as a single Paragraph instead of one per item"""
         
-        return filepath
+        if items:
+            story.append(Paragraph('<br/>'.join(f"• {item}" for item in _cap_items(items)), self.styles['Recommendation']))
     
-    def _add_cover_page(self, story: List, analysis: BusinessAnalysis):
+    def _add_cover_page(self, story: List, ctx: Dict[str, Any]):
         """Add cover page"""
         
         story.append(Spacer(1, 2*inch))
@@ -148,7 +526,7 @@ class ReportService:
         
         # Business name
         business_title = Paragraph(
-            f"<b>{analysis.business_name}</b>",
+            f"<b>{ctx['business_name']}</b>",
             self.styles['CustomTitle']
         )
         story.append(business_title)
@@ -157,231 +535,171 @@ class ReportService:
         # Key metrics box
         metrics_data = [
             ['Metric', 'Value'],
-            ['Total Revenue', f"${analysis.total_revenue:,.2f}"],
-            ['Revenue Leakage', f"${analysis.leakage_amount:,.2f}"],
-            ['Leakage Percentage', f"{analysis.leakage_percentage}%"],
-            ['Risk Score', f"{analysis.risk_score}/100"],
-            ['Recoverable Amount', f"${analysis.revenue_analysis.get('recoverable_amount', 0):,.2f}"]
+            ['Total Revenue', ctx['total_revenue_fmt']],
+            ['Revenue Leakage', ctx['leakage_amount_fmt']],
+            ['Leakage Percentage', f"{ctx['leakage_percentage']}%"],
+            ['Risk Score', f"{ctx['risk_score']}/100"],
+            ['Recoverable Amount', ctx['recoverable_fmt']]
         ]
         
         metrics_table = Table(metrics_data, colWidths=[3*inch, 2.5*inch])
-        metrics_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 11),
-            ('ROWHEIGHT', (0, 1), (-1, -1), 25)
-        ]))
+        metrics_table.setStyle(METRICS_TABLE_STYLE)
         
         story.append(metrics_table)
         story.append(Spacer(1, 0.5*inch))
         
         # Date
         date_text = Paragraph(
-            f"<i>Generated on: {datetime.now().strftime('%B %d, %Y')}</i>",
+            GENERATED_ON_TMPL.format_map(ctx),
             self.styles['Normal']
         )
         story.append(date_text)
     
-    def _add_executive_summary(self, story: List, analysis: BusinessAnalysis):
+    def _add_executive_summary(self, story: List, ctx: Dict[str, Any]):
         """Add executive summary section"""
         
         story.append(Paragraph("Executive Summary", self.styles['SectionHeading']))
         
-        risk_level = analysis.revenue_analysis['risk_assessment']['risk_level']
-        
-        summary_text = f"""
-        This report presents a comprehensive analysis of revenue leakage for <b>{analysis.business_name}</b>, 
-        a {analysis.business_stage} {analysis.business_model} business in the {analysis.industry} industry.
-        <br/><br/>
-        <b>Overall Assessment:</b> {risk_level.upper()} RISK
-        <br/><br/>
-        Our analysis has identified <b>${analysis.leakage_amount:,.2f}</b> in potential revenue leakage, 
-        representing <b>{analysis.leakage_percentage}%</b> of total revenue. 
-        Of this amount, approximately <b>${analysis.revenue_analysis.get('recoverable_amount', 0):,.2f}</b> 
-        is recoverable through the implementation of recommended strategies.
-        <br/><br/>
-        The analysis identified <b>{len(analysis.leakage_points)} key leakage points</b> requiring immediate attention.
-        """
+        summary_text = SUMMARY_TMPL.format_map(ctx)
         
         story.append(Paragraph(summary_text, self.styles['Normal']))
     
-    def _add_revenue_analysis(self, story: List, analysis: BusinessAnalysis):
+    def _add_revenue_analysis(self, story: List, ctx: Dict[str, Any]):
         """Add revenue analysis section"""
         
         story.append(Paragraph("Revenue Analysis", self.styles['SectionHeading']))
         
         # Risk assessment
-        risk_data = analysis.revenue_analysis['risk_assessment']
-        
-        risk_text = f"""
-        <b>Risk Score:</b> {risk_data['overall_risk_score']}/100<br/>
-        <b>Risk Level:</b> {risk_data['risk_level'].upper()}<br/>
-        <b>Vulnerability Areas:</b> {', '.join(risk_data['vulnerability_areas'])}
-        """
+        risk_text = RISK_TMPL.format_map(ctx)
         
         story.append(Paragraph(risk_text, self.styles['Normal']))
         story.append(Spacer(1, 0.2*inch))
         
         # Top risk factors
-        if risk_data['risk_factors']:
+        if ctx['risk_factors']:
             story.append(Paragraph("<b>Key Risk Factors:</b>", self.styles['Normal']))
-            for factor in risk_data['risk_factors']:
-                story.append(Paragraph(f"• {factor}", self.styles['Recommendation']))
+            self._add_bullets(story, ctx['risk_factors'])
     
-    def _add_charts(self, story: List, analysis: BusinessAnalysis):
+    def _add_charts(self, story: List, ctx: Dict[str, Any]):
         """Add visualization charts"""
         
         story.append(Paragraph("Revenue Leakage Breakdown", self.styles['SectionHeading']))
         
-        # Create pie chart for leakage distribution
-        leakage_points = analysis.leakage_points
-        
-        if leakage_points and len(leakage_points) > 0:
-            # Prepare data
-            categories = [lp['category'][:20] for lp in leakage_points[:6]]  # Top 6
-            amounts = [lp['estimated_loss'] for lp in leakage_points[:6]]
-            
-            # Create drawing
-            drawing = Drawing(400, 200)
-            
-            # Create pie chart
-            pie = Pie()
-            pie.x = 150
-            pie.y = 50
-            pie.width = 150
-            pie.height = 150
-            pie.data = amounts
-            pie.labels = categories
-            pie.slices.strokeWidth = 0.5
+        # Create pie chart for leakage distribution (top 6 points, precomputed in the payload);
+        # skipped when none of them has a positive loss
+        chart_path = _render_pie_chart(ctx['chart_categories'], ctx['chart_amounts'])
+        if chart_path:
+            from reportlab.platypus import Image
             
-            # Color scheme
-            colors_list = [
-                colors.HexColor('#ef5350'),
-                colors.HexColor('#ff7043'),
-                colors.HexColor('#ffa726'),
-                colors.HexColor('#ffca28'),
-                colors.HexColor('#66bb6a'),
-                colors.HexColor('#42a5f5')
-            ]
-            
-            for i, color in enumerate(colors_list[:len(amounts)]):
-                pie.slices[i].fillColor = color
-            
-            drawing.add(pie)
-            story.append(drawing)
+            # Pre-rendered PNG, same footprint as the former 400x200pt drawing
+            story.append(Image(chart_path, width=400, height=200))
             story.append(Spacer(1, 0.3*inch))
     
-    def _add_leakage_details(self, story: List, analysis: BusinessAnalysis):
+    def _add_leakage_details(self, story: List, leakage_points: List):
         """Add detailed leakage breakdown"""
         
         story.append(Paragraph("Detailed Leakage Analysis", self.styles['SectionHeading']))
         
-        for i, lp in enumerate(analysis.leakage_points, 1):
-            # Leakage point header
-            header = f"{i}. {lp['category']} - ${lp['estimated_loss']:,.2f} ({lp['severity'].upper()})"
-            story.append(Paragraph(f"<b>{header}</b>", self.styles['Normal']))
-            
-            # Details
-            details = f"""
-            <b>Issue:</b> {lp['issue']}<br/>
-            <b>Impact:</b> {lp['percentage']}% of revenue<br/>
-            <b>Recommendation:</b> {lp['recommendation']}
-            """
-            story.append(Paragraph(details, self.styles['Recommendation']))
-            story.append(Spacer(1, 0.15*inch))
-    
-    def _add_recovery_strategy(self, story: List, analysis: BusinessAnalysis):
+        cell_style = self.styles['TableCell']
+        
+        # Past the cap, list the largest losses and fold the rest into one summary row
+        leakage_points = leakage_points or []
+        remainder = []
+        if len(leakage_points) > MAX_LEAKAGE_ROWS:
+            ranked = sorted(leakage_points, key=itemgetter('estimated_loss'), reverse=True)
+            leakage_points, remainder = ranked[:MAX_LEAKAGE_ROWS], ranked[MAX_LEAKAGE_ROWS:]
+        
+        # One paginating table instead of a Paragraph per leakage point
+        rows = [['#', 'Category', 'Loss', 'Impact', 'Severity', 'Issue', 'Recommendation']]
+        for i, lp in enumerate(leakage_points, 1):
+            rows.append([
+                str(i),
+                Paragraph(str(lp['category']), cell_style),
+                f"${lp['estimated_loss']:,.2f}",
+                f"{lp['percentage']}%",
+                lp['severity'].upper(),
+                Paragraph(str(lp['issue']), cell_style),
+                Paragraph(str(lp['recommendation']), cell_style)
+            ])
+        
+        if remainder:
+            rows.append([
+                '',
+                Paragraph(f"+{len(remainder)} more", cell_style),
+                f"${sum(lp['estimated_loss'] for lp in remainder):,.2f}",
+                '',
+                '',
+                Paragraph("Smaller leakage points, combined", cell_style),
+                ''
+            ])
+        
+        if len(rows) > 1:
+            leakage_table = LongTable(
+                rows,
+                colWidths=[0.3*inch, 1*inch, 0.85*inch, 0.6*inch, 0.7*inch, 1.4*inch, 1.65*inch],
+                repeatRows=1
+            )
+            leakage_table.setStyle(LEAKAGE_TABLE_STYLE)
+            story.append(leakage_table)
+    
+    def _add_recovery_strategy(self, story: List, strategy: Dict, ctx: Dict[str, Any]):
         """Add recovery strategy section"""
         
         story.append(Paragraph("Revenue Recovery Strategy", self.styles['SectionHeading']))
         
-        strategy = analysis.recovery_strategy
-        
         # Priority Actions
         story.append(Paragraph("<b>Priority Actions:</b>", self.styles['Normal']))
-        for action in strategy['priority_actions']:
-            action_text = f"• {action['action']} ({action['priority']} priority)"
-            story.append(Paragraph(action_text, self.styles['Recommendation']))
+        self._add_bullets(story, ctx['priority_actions'])
         
         story.append(Spacer(1, 0.2*inch))
         
         # Pricing Recommendations
         if strategy.get('pricing_recommendations'):
             story.append(Paragraph("<b>Pricing Optimization:</b>", self.styles['Normal']))
-            for rec in strategy['pricing_recommendations']:
-                story.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
+            self._add_bullets(story, strategy['pricing_recommendations'])
             story.append(Spacer(1, 0.2*inch))
         
         # Operational Improvements
         if strategy.get('operational_improvements'):
             story.append(Paragraph("<b>Operational Improvements:</b>", self.styles['Normal']))
-            for imp in strategy['operational_improvements']:
-                story.append(Paragraph(f"• {imp}", self.styles['Recommendation']))
+            self._add_bullets(story, strategy['operational_improvements'])
             story.append(Spacer(1, 0.2*inch))
         
         # Automation Suggestions
         if strategy.get('automation_suggestions'):
             story.append(Paragraph("<b>Automation Opportunities:</b>", self.styles['Normal']))
-            for sug in strategy['automation_suggestions']:
-                story.append(Paragraph(f"• {sug}", self.styles['Recommendation']))
+            self._add_bullets(story, strategy['automation_suggestions'])
     
-    def _add_implementation_plan(self, story: List, analysis: BusinessAnalysis):
+    def _add_implementation_plan(self, story: List, recovery_strategy: Dict, ctx: Dict[str, Any]):
         """Add implementation timeline"""
         
         story.append(Paragraph("Implementation Timeline", self.styles['SectionHeading']))
         
-        timeline = analysis.recovery_strategy.get('implementation_timeline', {})
+        timeline = recovery_strategy.get('implementation_timeline', {})
         
         timeline_data = [
             ['Phase', 'Actions'],
-            ['Immediate', '<br/>'.join(timeline.get('immediate', ['N/A']))],
-            ['30 Days', '<br/>'.join(timeline.get('30_days', ['N/A']))],
-            ['60 Days', '<br/>'.join(timeline.get('60_days', ['N/A']))],
-            ['90 Days', '<br/>'.join(timeline.get('90_days', ['N/A']))]
+            ['Immediate', '<br/>'.join(_cap_items(timeline.get('immediate', ['N/A'])))],
+            ['30 Days', '<br/>'.join(_cap_items(timeline.get('30_days', ['N/A'])))],
+            ['60 Days', '<br/>'.join(_cap_items(timeline.get('60_days', ['N/A'])))],
+            ['90 Days', '<br/>'.join(_cap_items(timeline.get('90_days', ['N/A'])))]
         ]
         
         timeline_table = Table(timeline_data, colWidths=[1.5*inch, 5*inch])
-        timeline_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d47a1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ]))
+        timeline_table.setStyle(TIMELINE_TABLE_STYLE)
         
         story.append(timeline_table)
         
         # Expected recovery
         story.append(Spacer(1, 0.3*inch))
-        expected = analysis.recovery_strategy.get('expected_recovery', 0)
-        recovery_text = f"""
-        <b>Expected Revenue Recovery:</b> ${expected:,.2f}<br/>
-        By implementing these recommendations, your business can recover a significant portion of lost revenue 
-        and prevent future leakage.
-        """
+        recovery_text = RECOVERY_TMPL.format_map(ctx)
         story.append(Paragraph(recovery_text, self.styles['HighlightBox']))
     
-    def _add_footer(self, story: List, report_id: str):
+    def _add_footer(self, story: List, ctx: Dict[str, Any]):
         """Add report footer"""
         
         story.append(Spacer(1, 0.5*inch))
         
-        footer_text = f"""
-        <br/><br/>
-        <i>This report was generated by Smart Revenue Leakage Advisor<br/>
-        Report ID: {report_id}<br/>
-        For more information, visit our website or contact support.</i>
-        """
+        footer_text = FOOTER_TMPL.format_map(ctx)
         
         story.append(Paragraph(footer_text, self.styles['Normal']))
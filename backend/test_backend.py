@@ -1,36 +1,42 @@
-import requests
+import asyncio
+import httpx
 import json
+import os
 
 # Base URL
 BASE_URL = "http://localhost:8000/api"
 
-print("🧪 Testing Backend API Endpoints\n")
-print("=" * 60)
-
-# Test 1: Health Check
-print("\n1️⃣ Testing Server Health...")
-try:
-    response = requests.get(f"{BASE_URL.replace('/api', '')}/")
-    print(f"✅ Server is running: {response.json()}")
-except Exception as e:
-    print(f"❌ Server check failed: {e}")
-
-# Test 2: Chatbot Topics
-print("\n2️⃣ Testing Chatbot Topics Endpoint...")
-try:
-    response = requests.get(f"{BASE_URL}/chatbot/topics")
-    data = response.json()
-    print(f"✅ Topics loaded: {len(data.get('topics', {}))} categories")
-    topics_list = list(data.get('topics', {}).items())
-    for key, topic in topics_list[:3]:
-        print(f"   - {topic.get('name', key)}")
-except Exception as e:
-    print(f"❌ Topics test failed: {e}")
-
-# Test 3: Chatbot Suggestions
-print("\n3️⃣ Testing Chatbot Suggestions Endpoint...")
-headers = {}
-try:
+
+# Each test collects its output lines so concurrent runs still print in order
+async def check_health(client):
+    lines = ["\n1️⃣ Testing Server Health..."]
+    try:
+        response = await client.get(f"{BASE_URL.replace('/api', '')}/")
+        lines.append(f"✅ Server is running: {response.json()}")
+    except Exception as e:
+        lines.append(f"❌ Server check failed: {e}")
+    return lines
+
+
+async def check_topics(client):
+    lines = ["\n2️⃣ Testing Chatbot Topics Endpoint..."]
+    try:
+        response = await client.get(f"{BASE_URL}/chatbot/topics")
+        data = response.json()
+        lines.append(f"✅ Topics loaded: {len(data.get('topics', {}))} categories")
+        topics_list = list(data.get('topics', {}).items())
+        for key, topic in topics_list[:3]:
+            lines.append(f"   - {topic.get('name', key)}")
+    except Exception as e:
+        lines.append(f"❌ Topics test failed: {e}")
+    return lines
+
+
+async def login(client):
+    """Create the test user if needed and set the bearer token on the client"""
+    lines = []
+    logged_in = False
+
     # Need to create a test user first
     signup_data = {
         "email": "test@example.com",
@@ -38,99 +44,156 @@ try:
         "full_name": "Test User",
         "company": "Test Company"
     }
-    
+
     # Try to signup (might fail if user exists, that's OK)
     try:
-        signup_response = requests.post(f"{BASE_URL}/auth/signup", json=signup_data)
+        signup_response = await client.post(f"{BASE_URL}/auth/signup", json=signup_data)
         if signup_response.status_code == 200:
-            print("   ✅ Test user created")
+            lines.append("   ✅ Test user created")
     except:
         pass
-    
+
     # Login to get token
     login_data = {
         "username": "test@example.com",
         "password": "test123"
     }
-    login_response = requests.post(f"{BASE_URL}/auth/login", data=login_data)
-    
+    login_response = await client.post(f"{BASE_URL}/auth/login", data=login_data)
+
     if login_response.status_code == 200:
         token = login_response.json()['access_token']
-        headers = {"Authorization": f"Bearer {token}"}
-        
-        # Get suggestions
-        response = requests.get(f"{BASE_URL}/chatbot/suggestions", headers=headers)
+        client.headers["Authorization"] = f"Bearer {token}"
+        logged_in = True
+    else:
+        lines.append(f"⚠️  Login failed, skipping authenticated tests")
+
+    return logged_in, lines
+
+
+async def check_suggestions(client):
+    lines = []
+    try:
+        response = await client.get(f"{BASE_URL}/chatbot/suggestions")
         data = response.json()
-        print(f"✅ Suggestions loaded: {len(data.get('suggestions', []))} suggestions")
+        lines.append(f"✅ Suggestions loaded: {len(data.get('suggestions', []))} suggestions")
         for sug in data.get('suggestions', [])[:3]:
-            print(f"   - {sug['question']}")
-    else:
-        print(f"⚠️  Login failed, skipping authenticated tests")
-        
-except Exception as e:
-    print(f"❌ Suggestions test failed: {e}")
-
-# Test 4: Chatbot Chat
-print("\n4️⃣ Testing Chatbot Chat Endpoint...")
-try:
-    # Use the token from previous test
-    chat_data = {
-        "message": "What is revenue leakage?"
-    }
-    
-    response = requests.post(f"{BASE_URL}/chatbot", json=chat_data, headers=headers)
-    data = response.json()
-    
-    if response.status_code == 200:
-        print(f"✅ Chat response received")
-        print(f"   Topic: {data.get('topic', 'N/A')}")
-        print(f"   Answer length: {len(data.get('answer', ''))} characters")
-        print(f"   Suggestions: {len(data.get('suggestions', []))} follow-ups")
-    else:
-        print(f"❌ Chat failed: {data}")
-        
-except Exception as e:
-    print(f"❌ Chat test failed: {e}")
-
-# Test 5: Enhanced Leakage Analyzer (via Upload)
-print("\n5️⃣ Testing Enhanced Leakage Analyzer...")
-try:
-    # Check if sample data file exists
-    import os
-    sample_file = "Sample_Revenue_Data.xlsx"
-    
-    if os.path.exists(sample_file):
-        print(f"   📁 Found sample file: {sample_file}")
-        
-        with open(sample_file, 'rb') as f:
-            files = {'file': f}
-            upload_response = requests.post(
+            lines.append(f"   - {sug['question']}")
+    except Exception as e:
+        lines.append(f"❌ Suggestions test failed: {e}")
+    return lines
+
+
+async def check_chat(client):
+    lines = ["\n4️⃣ Testing Chatbot Chat Endpoint..."]
+    try:
+        chat_data = {
+            "message": "What is revenue leakage?"
+        }
+
+        response = await client.post(f"{BASE_URL}/chatbot", json=chat_data)
+        data = response.json()
+
+        if response.status_code == 200:
+            lines.append(f"✅ Chat response received")
+            lines.append(f"   Topic: {data.get('topic', 'N/A')}")
+            lines.append(f"   Answer length: {len(data.get('answer', ''))} characters")
+            lines.append(f"   Suggestions: {len(data.get('suggestions', []))} follow-ups")
+        else:
+            lines.append(f"❌ Chat failed: {data}")
+
+    except Exception as e:
+        lines.append(f"❌ Chat test failed: {e}")
+    return lines
+
+
+async def check_upload(client):
+    lines = ["\n5️⃣ Testing Enhanced Leakage Analyzer..."]
+    try:
+        # Check if sample data file exists
+        sample_file = "Sample_Revenue_Data.xlsx"
+
+        if os.path.exists(sample_file):
+            lines.append(f"   📁 Found sample file: {sample_file}")
+
+            with open(sample_file, 'rb') as f:
+                files = {'file': (sample_file, f.read())}
+            upload_response = await client.post(
                 f"{BASE_URL}/upload/",
-                files=files,
-                headers=headers
+                files=files
             )
-        
-        if upload_response.status_code == 200:
-            result = upload_response.json()
-            print(f"✅ File uploaded and analyzed successfully")
-            print(f"   Upload ID: {result.get('id', 'N/A')}")
-            
-            # Check analysis data
-            if 'analysis_data' in result:
-                analysis = result['analysis_data']
-                print(f"   Total Revenue: ${analysis.get('total_revenue', 0):,.2f}")
-                print(f"   Issues Found: {len(analysis.get('leakage_items', []))}")
-                
-                # Show top issues
-                for item in analysis.get('leakage_items', [])[:3]:
-                    print(f"   - {item['type']}: ${item['amount']:,.2f} ({item['severity']})")
+
+            if upload_response.status_code == 200:
+                result = upload_response.json()
+                lines.append(f"✅ File uploaded and analyzed successfully")
+                lines.append(f"   Upload ID: {result.get('id', 'N/A')}")
+
+                # Check analysis data
+                if 'analysis_data' in result:
+                    analysis = result['analysis_data']
+                    lines.append(f"   Total Revenue: ${analysis.get('total_revenue', 0):,.2f}")
+                    lines.append(f"   Issues Found: {len(analysis.get('leakage_items', []))}")
+
+                    # Show top issues
+                    for item in analysis.get('leakage_items', [])[:3]:
+                        lines.append(f"   - {item['type']}: ${item['amount']:,.2f} ({item['severity']})")
+            else:
+                lines.append(f"❌ Upload failed: {upload_response.json()}")
         else:
-            print(f"❌ Upload failed: {upload_response.json()}")
+            lines.append(f"⚠️  Sample file not found, skipping upload test")
+
+    except Exception as e:
+        lines.append(f"❌ Upload test failed: {e}")
+    return lines
+
+
+async def check_authenticated(client):
+    """Login once, then run the tests that need the token concurrently"""
+    lines = ["\n3️⃣ Testing Chatbot Suggestions Endpoint..."]
+    logged_in = False
+    try:
+        logged_in, login_lines = await login(client)
+        lines.extend(login_lines)
+    except Exception as e:
+        lines.append(f"❌ Suggestions test failed: {e}")
+
+    if logged_in:
+        suggestions, chat, upload = await asyncio.gather(
+            check_suggestions(client),
+            check_chat(client),
+            check_upload(client)
+        )
+        lines.extend(suggestions)
     else:
-        print(f"⚠️  Sample file not found, skipping upload test")
-        
-except Exception as e:
-    print(f"❌ Upload test failed: {e}")
+        chat, upload = await asyncio.gather(
+            check_chat(client),
+            check_upload(client)
+        )
+
+    return lines + chat + upload
+
+
+async def main():
+    print("🧪 Testing Backend API Endpoints\n")
+    print("=" * 60)
+
+    # One client keeps a single keep-alive connection pool and shared headers for all tests
+    async with httpx.AsyncClient(
+        timeout=60.0,
+        headers={"User-Agent": "backend-test"},
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=4)
+    ) as client:
+        results = await asyncio.gather(
+            check_health(client),
+            check_topics(client),
+            check_authenticated(client)
+        )
+
+    for lines in results:
+        print("\n".join(lines))
+
+    print("\n" + "=" * 60)
+    print("🎉 Backend API Testing Complete!\n")
+
 
-print("\n" + "=" * 60)
-print("🎉 Backend API Testing Complete!\n")
+if __name__ == "__main__":
+    asyncio.run(main())
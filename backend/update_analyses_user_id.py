@@ -3,8 +3,18 @@ Update existing business analyses to have user_id
 This script assigns existing analyses without user_id to the admin user
 """
 
+from sqlalchemy import func
+
 from database.database import SessionLocal, BusinessAnalysis, User
 
+def _analysis_counts_by_user(db):
+    """Count analyses per user_id with one grouped query"""
+    return dict(
+        db.query(BusinessAnalysis.user_id, func.count(BusinessAnalysis.id))
+        .group_by(BusinessAnalysis.user_id)
+        .all()
+    )
+
 def update_analyses_user_id():
     db = SessionLocal()
     
@@ -15,54 +25,39 @@ def update_analyses_user_id():
             print("❌ Admin user not found. Run create_demo_user.py first.")
             return
         
-        # Get all analyses without user_id
-        analyses_without_user = db.query(BusinessAnalysis).filter(
-            BusinessAnalysis.user_id == None
-        ).all()
+        # Assign every analysis without user_id to admin in a single UPDATE
+        count = db.query(BusinessAnalysis).filter(
+            BusinessAnalysis.user_id.is_(None)
+        ).update({BusinessAnalysis.user_id: admin.id}, synchronize_session=False)
         
-        if not analyses_without_user:
+        if not count:
             print("✅ All analyses already have user_id assigned")
             
             # Show statistics
-            total_analyses = db.query(BusinessAnalysis).count()
-            admin_analyses = db.query(BusinessAnalysis).filter(
-                BusinessAnalysis.user_id == admin.id
-            ).count()
+            counts = _analysis_counts_by_user(db)
             
             print(f"\n📊 Analysis Statistics:")
-            print(f"   Total analyses: {total_analyses}")
-            print(f"   Admin's analyses: {admin_analyses}")
+            print(f"   Total analyses: {sum(counts.values())}")
+            print(f"   Admin's analyses: {counts.get(admin.id, 0)}")
             
             # List all users with their analysis count
             users = db.query(User).all()
             print(f"\n👥 Users and their analyses:")
             for user in users:
-                user_analyses = db.query(BusinessAnalysis).filter(
-                    BusinessAnalysis.user_id == user.id
-                ).count()
-                print(f"   {user.email} ({user.role}): {user_analyses} analyses")
+                print(f"   {user.email} ({user.role}): {counts.get(user.id, 0)} analyses")
             
             return
         
-        # Assign them to admin
-        count = 0
-        for analysis in analyses_without_user:
-            analysis.user_id = admin.id
-            count += 1
-        
         db.commit()
         
         print(f"✅ Updated {count} analyses to be owned by {admin.email}")
         
         # Show updated statistics
-        total_analyses = db.query(BusinessAnalysis).count()
-        admin_analyses = db.query(BusinessAnalysis).filter(
-            BusinessAnalysis.user_id == admin.id
-        ).count()
+        counts = _analysis_counts_by_user(db)
         
         print(f"\n📊 Updated Analysis Statistics:")
-        print(f"   Total analyses: {total_analyses}")
-        print(f"   Admin's analyses: {admin_analyses}")
+        print(f"   Total analyses: {sum(counts.values())}")
+        print(f"   Admin's analyses: {counts.get(admin.id, 0)}")
         
     except Exception as e:
         print(f"❌ Error: {e}")
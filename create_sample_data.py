@@ -4,19 +4,185 @@ Script to create sample Excel files for testing the Revenue Scan analysis system
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-import random
+from xml.sax.saxutils import escape
+import zipfile
 
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+# pyarrow's multi-threaded CSV writer is optional; fall back to DataFrame.to_csv without it
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
 
-def create_sample_revenue_data():
+# numba is optional too; it only pays off for very large stress-test datasets
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Seed for reproducibility; each generator function gets its own child stream of it
+SEED = 42
+
+# Minimal SpreadsheetML parts for a value-only workbook
+XLSX_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+XLSX_ROOT_RELS = (
+    XML_HEADER +
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    f'<Relationship Id="rId1" Type="{XLSX_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+# Style 1 formats date cells; everything else uses the default style 0
+XLSX_STYLES = (
+    XML_HEADER +
+    f'<styleSheet xmlns="{XLSX_NS}">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+# Excel stores dates as days since 1899-12-30
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+
+def _column_letter(index):
+    """Convert a 0-based column index to an Excel column name (0 -> A, 26 -> AA)"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _string_cell(ref, value):
+    return f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _write_sheet(zf, name, df):
+    """Stream one DataFrame into a worksheet part, a row at a time"""
+    
+    letters = [_column_letter(i) for i in range(len(df.columns))]
+    
+    # Dates become Excel serial numbers up front so every row holds only numbers or text
+    values = df.copy()
+    kinds = []
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values[col] = (df[col] - EXCEL_EPOCH) / pd.Timedelta(days=1)
+            kinds.append('d')
+        elif pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            kinds.append('n')
+        else:
+            kinds.append('s')
+    
+    with zf.open(name, 'w') as f:
+        f.write(f'{XML_HEADER}<worksheet xmlns="{XLSX_NS}"><sheetData>'.encode())
+        
+        header = ''.join(_string_cell(f'{letter}1', col) for letter, col in zip(letters, df.columns))
+        f.write(f'<row r="1">{header}</row>'.encode())
+        
+        for r, row in enumerate(values.itertuples(index=False, name=None), start=2):
+            cells = []
+            for letter, kind, value in zip(letters, kinds, row):
+                # Missing values are left as empty cells, as with DataFrame.to_excel
+                if pd.isna(value):
+                    continue
+                if kind == 'n':
+                    cells.append(f'<c r="{letter}{r}"><v>{value}</v></c>')
+                elif kind == 'd':
+                    cells.append(f'<c r="{letter}{r}" s="1"><v>{value!r}</v></c>')
+                else:
+                    cells.append(_string_cell(f'{letter}{r}', value))
+            f.write(f'<row r="{r}">{"".join(cells)}</row>'.encode())
+        
+        f.write(b'</sheetData></worksheet>')
+
+
+def write_xlsx_raw(path, sheets):
+    """Write DataFrames to an .xlsx file (one sheet each) by emitting the XML parts directly"""
+    
+    names = list(sheets)
+    
+    content_types = (
+        XML_HEADER +
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>' +
+        ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(names) + 1)
+        ) +
+        '</Types>'
+    )
+    
+    workbook = (
+        XML_HEADER +
+        f'<workbook xmlns="{XLSX_NS}" xmlns:r="{XLSX_REL_NS}"><sheets>' +
+        ''.join(
+            f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(names, 1)
+        ) +
+        '</sheets></workbook>'
+    )
+    
+    workbook_rels = (
+        XML_HEADER +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+        ''.join(
+            f'<Relationship Id="rId{i}" Type="{XLSX_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(names) + 1)
+        ) +
+        f'<Relationship Id="rId{len(names) + 1}" Type="{XLSX_REL_NS}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    )
+    
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', content_types)
+        zf.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        zf.writestr('xl/workbook.xml', workbook)
+        zf.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
+        zf.writestr('xl/styles.xml', XLSX_STYLES)
+        for i, name in enumerate(names, 1):
+            _write_sheet(zf, f'xl/worksheets/sheet{i}.xml', sheets[name])
+
+
+# Below this many rows the JIT compile costs more than the fused loop saves
+NUMBA_MIN_ROWS = 10_000
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True)
+    def _derive_amounts(quantity, price, discount_mask, discount_rate, cost_rate, total, cost, discount, net):
+        """Fill the derived money columns in a single parallel pass over the rows"""
+        for i in prange(quantity.shape[0]):
+            t = quantity[i] * price[i]
+            d = t * discount_rate[i] if discount_mask[i] else 0.0
+            total[i] = t
+            cost[i] = t * cost_rate[i]
+            discount[i] = d
+            net[i] = t - d
+
+
+def create_sample_revenue_data(rng, num_transactions=300):
     """Create a comprehensive sample revenue dataset"""
     
     # Generate dates for the last 3 months
     start_date = datetime.now() - timedelta(days=90)
-    dates = [start_date + timedelta(days=i) for i in range(90)]
+    dates = np.array([start_date + timedelta(days=i) for i in range(90)])
     
     # Sample data
     customers = ['ABC Corp', 'XYZ Inc', 'Acme Ltd', 'Tech Solutions', 'Global Services', 
@@ -28,94 +194,89 @@ def create_sample_revenue_data():
                 'Product X', 'Product Y', 'Consulting', 'Support', 'Training',
                 'Hardware', 'Software License', 'Maintenance', 'Installation']
     
-    # Generate 300 transactions
-    num_transactions = 300
-    
     data = {
-        'Transaction_Date': [random.choice(dates) for _ in range(num_transactions)],
-        'Customer_Name': [random.choice(customers) for _ in range(num_transactions)],
-        'Product_Name': [random.choice(products) for _ in range(num_transactions)],
-        'Quantity': np.random.randint(1, 20, num_transactions),
-        'Unit_Price': np.random.uniform(50, 500, num_transactions).round(2),
-        'Total_Revenue': [],
-        'Cost_of_Goods': [],
-        'Discount_Amount': [],
-        'Net_Amount': []
+        'Transaction_Date': rng.choice(dates, num_transactions),
+        'Customer_Name': rng.choice(customers, num_transactions),
+        'Product_Name': rng.choice(products, num_transactions),
+        'Quantity': rng.integers(1, 20, num_transactions),
+        'Unit_Price': rng.uniform(50, 500, num_transactions).round(2),
     }
     
-    # Calculate derived fields
-    for i in range(num_transactions):
-        total_revenue = data['Quantity'][i] * data['Unit_Price'][i]
-        
-        # Add some discounts (15% of transactions)
-        if random.random() < 0.15:
-            discount = total_revenue * random.uniform(0.05, 0.25)
-        else:
-            discount = 0
-        
-        # Calculate cost (60-75% of revenue)
-        cost = total_revenue * random.uniform(0.60, 0.75)
-        
+    # Add some discounts (15% of transactions)
+    discount_mask = rng.random(num_transactions) < 0.15
+    discount_rate = rng.uniform(0.05, 0.25, num_transactions)
+    
+    # Calculate cost (60-75% of revenue)
+    cost_rate = rng.uniform(0.60, 0.75, num_transactions)
+    
+    # Calculate derived fields on whole arrays, or in one fused JIT loop for large datasets
+    if njit is not None and num_transactions > NUMBA_MIN_ROWS:
+        total_revenue, cost, discount, net_amount = (np.empty(num_transactions) for _ in range(4))
+        _derive_amounts(data['Quantity'], data['Unit_Price'], discount_mask, discount_rate, cost_rate,
+                        total_revenue, cost, discount, net_amount)
+    else:
+        total_revenue = data['Quantity'] * data['Unit_Price']
+        discount = total_revenue * np.where(discount_mask, discount_rate, 0.0)
+        cost = total_revenue * cost_rate
         net_amount = total_revenue - discount
-        
-        data['Total_Revenue'].append(round(total_revenue, 2))
-        data['Cost_of_Goods'].append(round(cost, 2))
-        data['Discount_Amount'].append(round(discount, 2))
-        data['Net_Amount'].append(round(net_amount, 2))
+    
+    data['Total_Revenue'] = total_revenue
+    data['Cost_of_Goods'] = cost
+    data['Discount_Amount'] = discount
+    data['Net_Amount'] = net_amount
     
     # Introduce some data quality issues for testing
     
     # 1. Add some negative revenues (refunds)
-    refund_indices = random.sample(range(num_transactions), 8)
-    for idx in refund_indices:
-        data['Total_Revenue'][idx] = -abs(data['Total_Revenue'][idx])
-        data['Net_Amount'][idx] = -abs(data['Net_Amount'][idx])
-    
-    # 2. Add missing data (10 rows)
-    missing_indices = random.sample(range(num_transactions), 10)
-    for idx in missing_indices:
-        if random.random() < 0.5:
-            data['Cost_of_Goods'][idx] = np.nan
-        else:
-            data['Discount_Amount'][idx] = np.nan
-    
-    # Create DataFrame first
-    df = pd.DataFrame(data)
+    refund_indices = rng.choice(num_transactions, size=8, replace=False)
+    data['Total_Revenue'][refund_indices] = -np.abs(data['Total_Revenue'][refund_indices])
+    data['Net_Amount'][refund_indices] = -np.abs(data['Net_Amount'][refund_indices])
     
-    # 3. Add duplicate rows (5 duplicates)
-    duplicate_rows = []
-    for _ in range(5):
-        dup_idx = random.randint(0, num_transactions-1)
-        duplicate_rows.append(df.iloc[dup_idx])
+    # 2. Add missing data (10 rows), each in either the cost or the discount column
+    missing_indices = rng.choice(num_transactions, size=10, replace=False)
+    cost_missing = rng.random(10) < 0.5
+    data['Cost_of_Goods'][missing_indices[cost_missing]] = np.nan
+    data['Discount_Amount'][missing_indices[~cost_missing]] = np.nan
     
-    if duplicate_rows:
-        df = pd.concat([df, pd.DataFrame(duplicate_rows)], ignore_index=True)
+    # 3. Add duplicate rows (5 duplicates), appended to every column at once
+    dup_idx = rng.integers(0, num_transactions, 5)
+    data = {col: np.concatenate([values, values[dup_idx]]) for col, values in data.items()}
     
     # 4. Add some pricing inconsistencies (same product, different prices)
-    widget_a_indices = df[df['Product_Name'] == 'Widget A'].index.tolist()
-    if len(widget_a_indices) > 5:
+    widget_a_pos = np.flatnonzero(data['Product_Name'] == 'Widget A')
+    if len(widget_a_pos) > 5:
         # Make some Widget A transactions much cheaper
-        for idx in widget_a_indices[:3]:
-            df.loc[idx, 'Unit_Price'] = df.loc[idx, 'Unit_Price'] * 0.6
-            df.loc[idx, 'Total_Revenue'] = df.loc[idx, 'Quantity'] * df.loc[idx, 'Unit_Price']
-            df.loc[idx, 'Net_Amount'] = df.loc[idx, 'Total_Revenue'] - df.loc[idx, 'Discount_Amount']
+        pos = widget_a_pos[:3]
+        data['Unit_Price'][pos] *= 0.6
+        data['Total_Revenue'][pos] = data['Quantity'][pos] * data['Unit_Price'][pos]
+        data['Net_Amount'][pos] = data['Total_Revenue'][pos] - data['Discount_Amount'][pos]
+    
+    # Round the money columns once, after every adjustment (the repriced rows included)
+    for col in ['Unit_Price', 'Total_Revenue', 'Cost_of_Goods', 'Discount_Amount', 'Net_Amount']:
+        np.round(data[col], 2, out=data[col])
     
     # Add additional computed columns
-    df['Profit'] = df['Net_Amount'] - df['Cost_of_Goods']
-    df['Profit_Margin_%'] = ((df['Profit'] / df['Net_Amount']) * 100).round(2)
+    data['Profit'] = data['Net_Amount'] - data['Cost_of_Goods']
+    data['Profit_Margin_%'] = np.round(data['Profit'] / data['Net_Amount'] * 100, 2)
     
-    return df
+    # The raw column arrays are returned too, so callers can aggregate without going through pandas
+    return pd.DataFrame(data), data
 
 
-def create_simple_sales_data():
+def create_simple_sales_data(rng):
     """Create a simpler sales dataset for basic testing"""
     
+    # Format each distinct label once and store the columns as categoricals
+    customer_cats = [f'Customer_{i}' for i in range(10)]
+    product_cats = [f'Product_{chr(65+i)}' for i in range(5)]
+    row_codes = np.arange(50)
+    
     data = {
         'Date': pd.date_range(start='2024-01-01', periods=50, freq='D'),
-        'Sales_Amount': np.random.uniform(100, 1000, 50).round(2),
-        'Cost': np.random.uniform(50, 500, 50).round(2),
-        'Customer': [f'Customer_{i%10}' for i in range(50)],
-        'Product': [f'Product_{chr(65+i%5)}' for i in range(50)]
+        'Sales_Amount': rng.uniform(100, 1000, 50).round(2),
+        'Cost': rng.uniform(50, 500, 50).round(2),
+        'Customer': pd.Categorical.from_codes(row_codes % 10, customer_cats),
+        'Product': pd.Categorical.from_codes(row_codes % 5, product_cats)
     }
     
     df = pd.DataFrame(data)
@@ -124,93 +285,113 @@ def create_simple_sales_data():
     return df
 
 
-def create_excel_with_multiple_sheets():
+def create_excel_with_multiple_sheets(df_complete, columns, rng):
     """Create Excel file with multiple sheets"""
     
-    # Create writer
-    with pd.ExcelWriter('Sample_Revenue_Data.xlsx', engine='openpyxl') as writer:
-        
-        # Sheet 1: Complete Revenue Data
-        df_complete = create_sample_revenue_data()
-        df_complete.to_excel(writer, sheet_name='Revenue_Transactions', index=False)
-        
-        # Sheet 2: Simple Sales Data
-        df_simple = create_simple_sales_data()
-        df_simple.to_excel(writer, sheet_name='Daily_Sales', index=False)
-        
-        # Sheet 3: Summary Statistics
-        summary = pd.DataFrame({
-            'Metric': ['Total Revenue', 'Total Cost', 'Net Profit', 'Transactions', 'Avg Transaction'],
-            'Value': [
-                df_complete['Total_Revenue'].sum(),
-                df_complete['Cost_of_Goods'].sum(),
-                df_complete['Profit'].sum(),
-                len(df_complete),
-                df_complete['Total_Revenue'].mean()
-            ]
-        })
-        summary.to_excel(writer, sheet_name='Summary', index=False)
+    # Sheet 1 is the complete revenue dataset passed in as df_complete (raw arrays in columns)
+    
+    # Sheet 2: Simple Sales Data
+    df_simple = create_simple_sales_data(rng)
+    
+    # Sheet 3: Summary Statistics
+    summary = pd.DataFrame({
+        'Metric': ['Total Revenue', 'Total Cost', 'Net Profit', 'Transactions', 'Avg Transaction'],
+        'Value': [
+            columns['Total_Revenue'].sum(),
+            np.nansum(columns['Cost_of_Goods']),
+            np.nansum(columns['Profit']),
+            len(columns['Total_Revenue']),
+            columns['Total_Revenue'].mean()
+        ]
+    })
+    
+    write_xlsx_raw('Sample_Revenue_Data.xlsx', {
+        'Revenue_Transactions': df_complete,
+        'Daily_Sales': df_simple,
+        'Summary': summary
+    })
     
     print("✅ Created 'Sample_Revenue_Data.xlsx' with 3 sheets")
 
 
-def create_csv_sample():
+def create_csv_sample(df):
     """Create CSV sample file"""
-    df = create_sample_revenue_data()
-    df.to_csv('Sample_Revenue_Data.csv', index=False)
+    if pa is not None:
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), 'Sample_Revenue_Data.csv')
+    else:
+        df.to_csv('Sample_Revenue_Data.csv', index=False)
     print("✅ Created 'Sample_Revenue_Data.csv'")
 
 
-def create_problem_dataset():
+def create_problem_dataset(rng):
     """Create a dataset with multiple issues for testing detection"""
     
-    data = {
-        'Invoice_Date': pd.date_range(start='2024-01-01', periods=100, freq='D'),
-        'Customer_ID': [f'CUST_{i%15:03d}' for i in range(100)],
-        'Product_Code': [f'SKU_{i%8:03d}' for i in range(100)],
-        'Revenue': np.random.uniform(100, 2000, 100).round(2),
-        'Cost': np.random.uniform(50, 1500, 100).round(2),
-        'Discount': np.random.uniform(0, 200, 100).round(2)
-    }
+    # Format each distinct ID once; the columns are categoricals built from integer codes
+    customer_cats = [f'CUST_{i:03d}' for i in range(15)] + ['CUST_999']
+    sku_cats = [f'SKU_{i:03d}' for i in range(8)]
+    row_codes = np.arange(100)
+    customer_codes = row_codes % 15
+    sku_codes = row_codes % 8
     
-    df = pd.DataFrame(data)
+    revenue = rng.uniform(100, 2000, 100).round(2)
+    cost = rng.uniform(50, 1500, 100).round(2)
+    discount = rng.uniform(0, 200, 100).round(2)
     
-    # Introduce various problems
+    # Introduce various problems on the raw arrays, before building the DataFrame
     
     # 1. Excessive discounts (25% of revenue for some)
-    df.loc[10:15, 'Discount'] = df.loc[10:15, 'Revenue'] * 0.25
+    discount[10:16] = revenue[10:16] * 0.25
     
     # 2. Negative revenue (refunds)
-    df.loc[20:25, 'Revenue'] = -abs(df.loc[20:25, 'Revenue'])
+    revenue[20:26] = -np.abs(revenue[20:26])
     
     # 3. Missing data
-    df.loc[30:35, 'Cost'] = np.nan
-    df.loc[40:42, 'Revenue'] = np.nan
-    
-    # 4. Duplicates
-    df = pd.concat([df, df.iloc[50:55]], ignore_index=True)
+    cost[30:36] = np.nan
+    revenue[40:43] = np.nan
     
     # 5. Customer concentration (one customer has 40% of revenue)
-    df.loc[60:80, 'Customer_ID'] = 'CUST_999'
-    df.loc[60:80, 'Revenue'] = np.random.uniform(1000, 5000, 21)
+    customer_codes[60:81] = customer_cats.index('CUST_999')
+    revenue[60:81] = rng.uniform(1000, 5000, 21)
     
     # 6. Pricing inconsistencies (same SKU, very different prices)
-    sku_001_indices = df[df['Product_Code'] == 'SKU_001'].index
-    if len(sku_001_indices) > 3:
-        df.loc[sku_001_indices[0], 'Revenue'] = 500
-        df.loc[sku_001_indices[1], 'Revenue'] = 1500  # 3x difference
-        df.loc[sku_001_indices[2], 'Revenue'] = 800
+    sku_001_pos = np.flatnonzero(sku_codes == sku_cats.index('SKU_001'))
+    if len(sku_001_pos) > 3:
+        revenue[sku_001_pos[:3]] = [500, 1500, 800]  # 3x difference
+    
+    df = pd.DataFrame({
+        'Invoice_Date': pd.date_range(start='2024-01-01', periods=100, freq='D'),
+        'Customer_ID': pd.Categorical.from_codes(customer_codes, customer_cats),
+        'Product_Code': pd.Categorical.from_codes(sku_codes, sku_cats),
+        'Revenue': revenue,
+        'Cost': cost,
+        'Discount': discount
+    })
+    
+    # 4. Duplicates (rows 50-54 are untouched by the other problems)
+    df = pd.concat([df, df.iloc[50:55]], ignore_index=True)
     
-    df.to_excel('Problem_Dataset.xlsx', index=False)
+    write_xlsx_raw('Problem_Dataset.xlsx', {'Sheet1': df})
     print("✅ Created 'Problem_Dataset.xlsx' (contains intentional issues for testing)")
 
 
 if __name__ == '__main__':
     print("🎯 Creating sample Excel and CSV files for Revenue Scan testing...\n")
     
-    create_excel_with_multiple_sheets()
-    create_csv_sample()
-    create_problem_dataset()
+    # Independent, reproducible random streams for the three generators, safe to use in parallel
+    revenue_rng, sales_rng, problem_rng = np.random.default_rng(SEED).spawn(3)
+    
+    # Generate the revenue dataset once; the Excel and CSV samples both use it
+    df_complete, columns = create_sample_revenue_data(revenue_rng)
+    
+    # The three files are independent, so build them in parallel processes
+    jobs = [
+        (create_excel_with_multiple_sheets, df_complete, columns, sales_rng),
+        (create_csv_sample, df_complete),
+        (create_problem_dataset, problem_rng)
+    ]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        for future in [executor.submit(*job) for job in jobs]:
+            future.result()
     
     print("\n✨ All sample files created successfully!")
     print("\n📋 Files created:")
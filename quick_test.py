@@ -3,13 +3,16 @@ import json
 
 BASE = "http://localhost:8000/api"
 
+# One session reuses the keep-alive connection and carries the auth header once set
+session = requests.Session()
+
 print("\n" + "="*70)
 print("TESTING ALL FEATURES WITH OPENAI")
 print("="*70)
 
 # Test 1: Server
 print("\n1. Server Health...")
-r = requests.get("http://localhost:8000/")
+r = session.get("http://localhost:8000/")
 print(f"✅ Server: {r.json()['message']}")
 
 # Test 2: Create User
@@ -20,22 +23,22 @@ user_data = {
     "full_name": "AI Test",
     "company": "TestCo"
 }
-r = requests.post(f"{BASE}/auth/signup", json=user_data)
+r = session.post(f"{BASE}/auth/signup", json=user_data)
 if r.status_code in [200, 201]:
     token = r.json()['access_token']
     print(f"✅ User created, token: {token[:20]}...")
 else:
     # Try login
-    r = requests.post(f"{BASE}/auth/login", json={"email": "aitest@test.com", "password": "Test123!"})
+    r = session.post(f"{BASE}/auth/login", json={"email": "aitest@test.com", "password": "Test123!"})
     token = r.json()['access_token']
     print(f"✅ User exists, logged in: {token[:20]}...")
 
-headers = {"Authorization": f"Bearer {token}"}
+session.headers.update({"Authorization": f"Bearer {token}"})
 
 # Test 3: AI Chatbot
 print("\n3. Testing AI Chatbot...")
 chat_data = {"message": "What is revenue leakage and how can I prevent it?"}
-r = requests.post(f"{BASE}/chatbot", json=chat_data, headers=headers)
+r = session.post(f"{BASE}/chatbot", json=chat_data)
 
 if r.status_code == 200:
     data = r.json()
@@ -56,7 +59,7 @@ sample_file = "Sample_Revenue_Data.xlsx"
 if os.path.exists(sample_file):
     with open(sample_file, 'rb') as f:
         files = {'file': f}
-        r = requests.post(f"{BASE}/upload/", files=files, headers=headers)
+        r = session.post(f"{BASE}/upload/", files=files)
     
     if r.status_code == 200:
         result = r.json()
@@ -85,7 +88,7 @@ else:
 
 # Test 5: Dashboard
 print("\n5. Testing Dashboard...")
-r = requests.get(f"{BASE}/dashboard/", headers=headers)
+r = session.get(f"{BASE}/dashboard/")
 if r.status_code == 200:
     data = r.json()
     print(f"✅ Dashboard working!")
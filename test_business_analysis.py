@@ -9,11 +9,15 @@ sys.path.append('backend')
 
 from services.business_analysis_service import business_analysis_service
 
-async def test_new_business_analysis():
-    """Test new business analysis"""
+def print_header(title):
     print("\n" + "="*60)
-    print("Testing NEW BUSINESS ANALYSIS")
+    print(title)
     print("="*60)
+
+# The tests run concurrently, so each prints its header only once its analysis
+# has returned; that keeps every test's output in one block
+async def test_new_business_analysis():
+    """Test new business analysis"""
     
     test_data = {
         'business_name': 'TechGadgets Store',
@@ -34,6 +38,7 @@ async def test_new_business_analysis():
     
     try:
         result = await business_analysis_service.analyze_new_business(test_data)
+        print_header("Testing NEW BUSINESS ANALYSIS")
         
         print(f"\n✅ Analysis ID: {result['analysis_id']}")
         print(f"✅ Business: {result['business_name']}")
@@ -64,6 +69,7 @@ async def test_new_business_analysis():
         return True
         
     except Exception as e:
+        print_header("Testing NEW BUSINESS ANALYSIS")
         print(f"\n❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -72,9 +78,6 @@ async def test_new_business_analysis():
 
 async def test_existing_business_analysis():
     """Test existing business analysis"""
-    print("\n" + "="*60)
-    print("Testing EXISTING BUSINESS ANALYSIS")
-    print("="*60)
     
     test_data = {
         'business_name': 'Fashion Boutique',
@@ -103,6 +106,7 @@ async def test_existing_business_analysis():
     
     try:
         result = await business_analysis_service.analyze_existing_business(test_data)
+        print_header("Testing EXISTING BUSINESS ANALYSIS")
         
         print(f"\n✅ Analysis ID: {result['analysis_id']}")
         print(f"✅ Business: {result['business_name']}")
@@ -142,6 +146,7 @@ async def test_existing_business_analysis():
         return True
         
     except Exception as e:
+        print_header("Testing EXISTING BUSINESS ANALYSIS")
         print(f"\n❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -156,11 +161,11 @@ async def main():
     print("\nThis will test both analysis endpoints with sample data.")
     print("OpenAI API will be called to generate intelligent insights.\n")
     
-    # Test 1: New Business
-    test1_passed = await test_new_business_analysis()
-    
-    # Test 2: Existing Business
-    test2_passed = await test_existing_business_analysis()
+    # Test 1 (new business) and Test 2 (existing business) are independent, so run them together
+    test1_passed, test2_passed = await asyncio.gather(
+        test_new_business_analysis(),
+        test_existing_business_analysis()
+    )
     
     # Summary
     print("\n" + "="*60)
@@ -3,15 +3,18 @@ import json
 
 BASE = "http://localhost:8000/api"
 
+# One session reuses the keep-alive connection and carries the auth header once set
+session = requests.Session()
+
 print("\n=== CHATBOT TEST ===\n")
 
 # 1. Login
 print("1. Logging in as admin...")
-r = requests.post(f"{BASE}/auth/login", json={"email": "admin@revenue.com", "password": "admin123"})
+r = session.post(f"{BASE}/auth/login", json={"email": "admin@revenue.com", "password": "admin123"})
 if r.status_code == 200:
     token = r.json()['access_token']
     print(f"✅ Logged in successfully")
-    headers = {"Authorization": f"Bearer {token}"}
+    session.headers.update({"Authorization": f"Bearer {token}"})
 else:
     print(f"❌ Login failed: {r.status_code}")
     print(r.text)
@@ -20,7 +23,7 @@ else:
 # 2. Test chatbot
 print("\n2. Testing chatbot...")
 chat_data = {"message": "What is revenue leakage?"}
-r = requests.post(f"{BASE}/chatbot", json=chat_data, headers=headers)
+r = session.post(f"{BASE}/chatbot", json=chat_data)
 
 print(f"Status: {r.status_code}")
 print(f"Response: {r.text[:500]}...")